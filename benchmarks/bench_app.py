@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import synthetic_run
+from src.store import SECONDS_PER_DAY
+
+pytest.importorskip("tkinter")
+from src.app import App  # noqa: E402
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+
+class PlotHarness():
+    """The plotting half of App on an Agg canvas, no Tk window needed.
+
+    Borrows App's own methods, so it measures the code the GUI runs."""
+    handle_event = App.handle_event
+    update_plot = App.update_plot
+    blit = App.blit
+    _draw_lines = App._draw_lines
+    _on_draw = App._on_draw
+
+    def __init__(self, hour: int = 24):
+        from src.lod import MinMaxLOD
+        from src.store import MeasurementStore
+
+        self.fig = Figure()
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(1, 1, 1)
+        self.ax_humidity = self.ax.twinx()
+        self.plot_data = MeasurementStore()
+        self.lods = {name: MinMaxLOD(1024) for name in ("real", "target", "humidity")}
+        self.plot_real_temp = self.ax.plot([], [], animated=True)[0]
+        self.plot_target_temp = self.ax.plot([], [], animated=True)[0]
+        self.plot_humidity = self.ax_humidity.plot([], [], animated=True)[0]
+        self.ax.set_xlim(0, 3600*hour)
+        self.ax.set_ylim(-50, 150)
+        self.ax_humidity.set_ylim(0, 100)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+
+
+def _events(data):
+    return [{"type": "sample", "day": 1, "elapsed": elapsed, "real_temp": real,
+             "target_temp": target, "humidity": humidity}
+            for elapsed, real, target, humidity in
+            zip(data.elapsed.tolist(), data.real_temps.tolist(),
+                data.target_temps.tolist(), data.humidities.tolist())]
+
+
+@pytest.mark.parametrize("hours", (1, 12, 24))
+def bench_update_plot(benchmark, hours):
+    # One poll of the GUI: a minute of samples on top of hours of them
+    harness = PlotHarness()
+    data = synthetic_run(hours / 24)
+    for event in _events(data):
+        harness.handle_event(event)
+    size = len(harness.plot_data)
+    batch = _events(synthetic_run(60 / SECONDS_PER_DAY + 1e-9))
+    offset = data.elapsed[-1] if len(data) > 0 else 0.0
+    for event in batch:
+        event["elapsed"] += offset
+
+    def poll():
+        for event in batch:
+            harness.handle_event(event)
+        harness.blit()
+
+    def setup():
+        harness.plot_data._size = size
+
+    benchmark.pedantic(poll, setup=setup, rounds=50, warmup_rounds=1)
+
+
+def bench_full_redraw(benchmark):
+    # A full day through the level of detail and a complete canvas draw
+    harness = PlotHarness()
+    for event in _events(synthetic_run(1)):
+        harness.handle_event(event)
+
+    def redraw():
+        harness.update_plot(redraw=False)
+        harness.canvas.draw()
+
+    benchmark.pedantic(redraw, rounds=10)
@@ -0,0 +1,91 @@
+import datetime as dt
+
+from conftest import SAMPLE_INTERVAL_S, FakeSensor, seeded_controller
+from src.acquisition import Reading
+from src.profiles import ProfileCache, parse_profile
+from src.runner import Runner
+
+# One hour of samples per round
+BATCH = 3600 // SAMPLE_INTERVAL_S
+
+
+def _rewind(controller, size):
+    # Drops what the previous round added, keeping the seeded history
+    controller.data._size = size
+    controller.hour = 12
+
+
+def bench_add_data_point(benchmark, controller):
+    size = len(controller.data)
+    start = controller.last_event_t
+
+    def add_hour():
+        for index in range(1, BATCH + 1):
+            controller.add_data_point(
+                25.0, start + dt.timedelta(seconds=index*SAMPLE_INTERVAL_S), 50.0)
+
+    benchmark.pedantic(add_hour, setup=lambda: _rewind(controller, size),
+                       rounds=20, warmup_rounds=1)
+
+
+def bench_runner_step(benchmark, controller):
+    # An hour of fake sensor readings through the runner, events included
+    runner = Runner(controller, FakeSensor(), SAMPLE_INTERVAL_S)
+    subscription = runner.subscribe()
+    size = len(controller.data)
+    start = controller.last_event_t
+    sensor = FakeSensor()
+    readings = []
+    for index in range(1, BATCH + 1):
+        sample = sensor.read()
+        readings.append(Reading(time=start + dt.timedelta(seconds=index*SAMPLE_INTERVAL_S),
+                                real_temp=sample.temperature, humidity=sample.humidity))
+
+    def setup():
+        _rewind(controller, size)
+        for _ in subscription.drain():
+            pass
+        for reading in readings:
+            runner.channel.put(reading)
+
+    benchmark.pedantic(runner.step, setup=setup, rounds=20, warmup_rounds=1)
+
+
+def bench_get_profile(benchmark, controller):
+    # Served by the cache after the first call
+    benchmark(controller.get_profile)
+
+
+def bench_recalculate(benchmark, controller):
+    # Today in memory and every closed day on disk
+    def recalculate():
+        controller.recalculate()
+        controller.saver.wait()
+
+    benchmark.pedantic(recalculate, rounds=5, warmup_rounds=1)
+
+
+def bench_parse_profile_csv(benchmark, profiles):
+    benchmark(parse_profile, profiles[0])
+
+
+def bench_parse_profile_xlsx(benchmark, profiles):
+    benchmark.pedantic(parse_profile, args=(profiles[1],), rounds=5)
+
+
+def bench_load_profile_cold(benchmark, profiles):
+    # Compiling the profile without the cache or its sidecar
+    def load():
+        ProfileCache(sidecar=False).load(profiles[1])
+
+    benchmark.pedantic(load, rounds=5)
+
+
+def bench_seed(benchmark, days, profiles):
+    # Reference for the fixtures, the cost of building the run itself
+    def seed():
+        controller = seeded_controller(days, profiles[0])
+        controller.close_session(discard=True)
+        controller.saver.stop()
+
+    benchmark.pedantic(seed, rounds=3)
@@ -0,0 +1,74 @@
+import datetime as dt
+
+import pytest
+
+from conftest import SAMPLE_INTERVAL_S, synthetic_run
+from src.render import RENDER_TIERS, render_day
+from src.replay import load_archive
+
+BATCH = 3600 // SAMPLE_INTERVAL_S
+
+
+def _add_hour(controller):
+    start = controller.last_event_t
+    for index in range(1, BATCH + 1):
+        controller.add_data_point(
+            25.0, start + dt.timedelta(seconds=index*SAMPLE_INTERVAL_S), 50.0)
+    # Stays within the day however many rounds run
+    controller.hour = 12
+
+
+def bench_save_session(benchmark, controller):
+    # The hourly checkpoint: new rows, today's figure and the manifest
+    def save():
+        controller.save_session()
+        controller.saver.wait()
+
+    benchmark.pedantic(save, setup=lambda: _add_hour(controller),
+                       rounds=10, warmup_rounds=1)
+
+
+def bench_export(benchmark, controller):
+    # The archive once the closed days have their final figures
+    controller.export_session()
+    controller.saver.wait()
+
+    def export():
+        controller.export_session()
+        controller.saver.wait()
+
+    benchmark.pedantic(export, rounds=3)
+
+
+def bench_save_as_first(benchmark, days, profiles):
+    # The first save as of a run, every closed day is rendered
+    from conftest import seeded_controller
+    controllers = []
+
+    def setup():
+        controllers.append(seeded_controller(days, profiles[0]))
+        return (controllers[-1],), {}
+
+    def save_as(controller):
+        controller.save_as_session()
+        controller.saver.wait()
+
+    try:
+        benchmark.pedantic(save_as, setup=setup, rounds=1)
+    finally:
+        for controller in controllers:
+            controller.close_session(discard=True)
+            controller.saver.stop()
+
+
+@pytest.mark.parametrize("tier", RENDER_TIERS)
+def bench_plot(benchmark, tier):
+    data = synthetic_run(1)
+    benchmark.pedantic(render_day, args=(data, "Benchmark — Day 1", RENDER_TIERS[tier]),
+                       rounds=3)
+
+
+def bench_load_archive(benchmark, controller):
+    controller.export_session()
+    controller.saver.wait()
+    benchmark(load_archive, controller.measurement_path)
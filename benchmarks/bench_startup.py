@@ -0,0 +1,29 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+# Loaded on first use, never by merely starting up
+LAZY_MODULES = ("matplotlib", "openpyxl", "smtplib", "email.message", "http.server")
+
+
+def _interpreter(code: str) -> str:
+    # A fresh interpreter each round, so nothing is imported yet
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+@pytest.mark.parametrize("module", ["src.app", "src.daemon"])
+def bench_cold_import(benchmark, module):
+    # What runs before the window or the daemon can do anything
+    benchmark.pedantic(_interpreter, args=(f"import {module}",), rounds=5, warmup_rounds=1)
+
+
+def bench_lazy_modules(benchmark):
+    code = ("import sys, src.app; "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    loaded = benchmark.pedantic(_interpreter, args=(code,), rounds=3)
+    assert loaded.strip() == "", f"imported at startup: {loaded.strip()}"
@@ -0,0 +1,130 @@
+"""Synthetic runs and fixtures shared by the benchmarks.
+
+Everything runs headless on the Agg backend, with a fake sensor, inside a
+temporary working directory so sessions never touch resources/."""
+import datetime as dt
+import pathlib
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from src.controller import Controller, write_day  # noqa: E402
+from src.profiles import load_profile  # noqa: E402
+from src.sensor import Sample  # noqa: E402
+from src.store import SECONDS_PER_DAY, MeasurementStore  # noqa: E402
+
+SAMPLE_INTERVAL_S = 10
+# Lengths of the synthetic runs, in days
+RUN_DAYS = (1, 7, 30)
+START_T = dt.datetime(2026, 1, 1)
+
+
+class FakeSensor():
+    "Deterministic stand-in for the SHT31, a slow sine with fixed noise"
+    conversion_time = 0.0
+
+    def __init__(self, bus: int = 1, address: int = 0x45, seed: int = 0):
+        self._rng = np.random.default_rng(seed)
+        self._count = 0
+
+    def trigger(self) -> None:
+        pass
+
+    def fetch(self) -> Sample:
+        self._count += 1
+        elapsed = self._count * SAMPLE_INTERVAL_S
+        noise = self._rng.normal(0, 0.1)
+        return Sample(temperature=round(25 + 10*np.sin(elapsed/7200) + noise, 2),
+                      humidity=round(50 + 5*np.cos(elapsed/7200), 2))
+
+    def read(self) -> Sample:
+        return self.fetch()
+
+    def close(self) -> None:
+        pass
+
+
+def synthetic_run(days: float, seed: int = 0) -> MeasurementStore:
+    elapsed = np.arange(SAMPLE_INTERVAL_S, days*SECONDS_PER_DAY + 1, SAMPLE_INTERVAL_S,
+                        dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    real = 25 + 10*np.sin(elapsed/7200) + rng.normal(0, 0.1, len(elapsed))
+    humidity = 50 + 5*np.cos(elapsed/7200)
+    return MeasurementStore.from_columns(elapsed, real, np.full(len(elapsed), np.nan), humidity)
+
+
+def write_profiles(directory: pathlib.Path, days: int = 30) -> tuple[pathlib.Path, pathlib.Path]:
+    # An hourly ramp over the whole run, as CSV and as XLSX
+    import openpyxl as xl
+
+    hours = np.arange(days*24 + 1)
+    temps = 20 + 40*((hours // 6) % 2)
+    csv_path = directory.joinpath("profile.csv")
+    with csv_path.open("w") as file:
+        file.write("duration,temperature\n")
+        for hour, temp in zip(hours.tolist(), temps.tolist()):
+            file.write(f"{hour:02}:00:00,{temp}\n")
+
+    xlsx_path = directory.joinpath("profile.xlsx")
+    wb = xl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["duration", "temperature"])
+    for hour, temp in zip(hours.tolist(), temps.tolist()):
+        ws.append([dt.timedelta(hours=hour), temp])
+    wb.save(xlsx_path)
+    return csv_path, xlsx_path
+
+
+def seeded_controller(days: int, profile_path: pathlib.Path = None) -> Controller:
+    """A controller half way through the last day of a days long run.
+
+    The closed days are written straight into the session, which is what
+    daily_save would have left behind, without rendering their figures."""
+    run = synthetic_run(days - 0.5)
+    controller = Controller(start_t=START_T, profile_path=profile_path,
+                            measurement_path=pathlib.Path("measurement.zip"))
+    if profile_path is not None:
+        controller.profile = load_profile(profile_path)
+        controller.apply_profile(run)
+    session = controller.open_session()
+    for day, data in run.days():
+        if day < days:
+            write_day(session, day, data)
+        else:
+            controller.data.extend(data.elapsed, data.real_temps,
+                                   data.target_temps, data.humidities)
+    session.commit()
+    controller.day = days
+    controller.hour = 12
+    controller.last_event_t = START_T + dt.timedelta(seconds=float(run.elapsed[-1]))
+    return controller
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(params=RUN_DAYS, ids=lambda days: f"{days}d")
+def days(request) -> int:
+    return request.param
+
+
+@pytest.fixture
+def profiles(workdir) -> tuple[pathlib.Path, pathlib.Path]:
+    return write_profiles(workdir)
+
+
+@pytest.fixture
+def controller(days, profiles):
+    controller = seeded_controller(days, profiles[0])
+    yield controller
+    controller.close_session(discard=True)
+    controller.saver.stop()
@@ -0,0 +1,99 @@
+"""Accelerated soak run of a simulated chamber.
+
+A simulated clock and a chamber following the profile with a first order lag
+drive the real controller and runner, so a month of samples, checkpoints, day
+rollovers and the final export run in minutes. Prints what every simulated
+day cost in wall time and how big the session grew.
+
+    python benchmarks/soak.py --days 30 --interval 10
+"""
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from conftest import START_T, write_profiles  # noqa: E402
+from src.acquisition import Channel, Reading  # noqa: E402
+from src.clock import SimulatedClock  # noqa: E402
+from src.controller import Controller  # noqa: E402
+from src.runner import Runner  # noqa: E402
+from src.sensor import SimulatedSensor  # noqa: E402
+from src.store import SECONDS_PER_DAY  # noqa: E402
+
+
+def _size(root: pathlib.Path) -> int:
+    return sum(path.stat().st_size for path in root.rglob("*") if path.is_file())
+
+
+def soak(days: int, interval: float, profile_path: pathlib.Path = None,
+         batch: int = 6, tau: float = 900.0, seed: int = 0) -> None:
+    clock = SimulatedClock(START_T)
+    controller = Controller(start_t=START_T, clock=clock, profile_path=profile_path,
+                            measurement_path=pathlib.Path("soak.zip"))
+    if profile_path is not None:
+        controller.recalculate()
+    sensor = SimulatedSensor(target=controller.target_at, clock=clock, tau=tau, seed=seed)
+    # Fed straight from the simulated sensor, no acquisition thread
+    channel = Channel(sensor, maxsize=batch)
+    runner = Runner(controller, sensor, interval, channel=channel)
+    runner.start(controller.measurement_path)
+
+    print(f"{'day':>4} {'samples':>8} {'wall s':>8} {'saves s':>8} {'session MB':>11}")
+    ticks = int(SECONDS_PER_DAY // interval)
+    total = time.perf_counter()
+    for day in range(1, days + 1):
+        started = time.perf_counter()
+        for tick in range(1, ticks + 1):
+            clock.advance(interval)
+            sample = sensor.read()
+            channel.put(Reading(clock.now(), sample.temperature, sample.humidity))
+            if tick % batch == 0:
+                runner.step()
+        runner.step()
+        # The saver is left to catch up, so its backlog counts against the day
+        waited = time.perf_counter()
+        controller.saver.wait()
+        runner.step()
+        now = time.perf_counter()
+        print(f"{day:>4} {len(controller.data):>8} {now - started:>8.2f} "
+              f"{now - waited:>8.2f} {_size(controller.session.root) / 1e6:>11.2f}")
+
+    started = time.perf_counter()
+    runner.save()
+    controller.saver.wait()
+    runner.step()
+    print(f"export {time.perf_counter() - started:.2f} s, "
+          f"archive {os.path.getsize(controller.measurement_path) / 1e6:.2f} MB, "
+          f"total {time.perf_counter() - total:.1f} s")
+    runner.close(discard=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between samples")
+    parser.add_argument("--profile", type=pathlib.Path,
+                        help="profile to follow, an hourly ramp over the run by default")
+    parser.add_argument("--batch", type=int, default=6, help="samples per runner step")
+    parser.add_argument("--tau", type=float, default=900.0, help="chamber time constant in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profile_path = None if args.profile is None else args.profile.resolve()
+    with tempfile.TemporaryDirectory() as directory:
+        # Sessions and the archive stay out of resources/
+        os.chdir(directory)
+        if profile_path is None:
+            profile_path, _ = write_profiles(pathlib.Path(directory), args.days)
+        soak(args.days, args.interval, profile_path, args.batch, args.tau, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,45 @@
 #!/usr/bin/python3
 import os.path
-
-
-from src.app import App
-from src.controller import Controller
+import sys
 
 
 if __name__ == "__main__":
     DIR_PATH = os.path.dirname(__file__)
     os.chdir(DIR_PATH)
-    controller = Controller()
-    app = App(controller)
-    app.mainloop()
+    args = sys.argv[1:]
+    # Seconds between samples, e.g. "interval 0.5"
+    interval = 10.0
+    if "interval" in args:
+        index = args.index("interval")
+        try:
+            interval = float(args[index + 1])
+        except (IndexError, ValueError):
+            interval = None
+        if interval is None or not 0 < interval < float("inf"):
+            sys.exit("usage: main.py [headless | attach [name]] [debug] [periodic] "
+                     "[interval <seconds>]\nThe interval is a positive number of seconds.")
+        del args[index:index + 2]
+
+    if "headless" in args:
+        # Runs the chambers without a GUI, attach to one with "attach [name]"
+        from src.daemon import main as headless
+        headless(debug="debug" in args, periodic="periodic" in args, interval=interval)
+    else:
+        from src.app import App
+        from src.controller import Controller
+
+        chamber = None
+        if "attach" in args:
+            rest = [arg for arg in args[args.index("attach") + 1:]
+                    if arg not in ("debug", "periodic")]
+            chamber = rest[0] if len(rest) > 0 else None
+
+        # Picks up a measurement the last run did not get to close, an
+        # attached GUI must not touch the sessions of another instance
+        if "attach" in args:
+            controller = Controller()
+        else:
+            controller = Controller.recover() or Controller()
+        app = App(controller, remote="attach" in args, chamber=chamber,
+                  interval=interval, periodic="periodic" in args)
+        app.mainloop()
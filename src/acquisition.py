@@ -0,0 +1,175 @@
+import asyncio
+import datetime as dt
+import queue
+import threading
+from typing import Iterator, NamedTuple
+
+from src.clock import Clock, Schedule
+from src.metrics import METRICS
+from src.sensor import AsyncSensor, periodic_rate
+
+
+class Reading(NamedTuple):
+    time: dt.datetime
+    real_temp: float
+    humidity: float
+
+
+class Channel():
+    "Readings of one sensor, paused and drained independently of the others"
+
+    def __init__(self, sensor, maxsize: int = 360):
+        self.sensor = sensor
+        self.readings: queue.Queue[Reading] = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        # What broke the sensor, the channel is skipped until the runner reports it
+        self.error: Exception = None
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    def put(self, reading: Reading) -> None:
+        # When the consumer falls behind the oldest reading gives way
+        while True:
+            try:
+                self.readings.put_nowait(reading)
+                return
+            except queue.Full:
+                try:
+                    self.readings.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def drain(self) -> Iterator[Reading]:
+        while True:
+            try:
+                yield self.readings.get_nowait()
+            except queue.Empty:
+                return
+
+    def pause(self) -> None:
+        self._running.clear()
+        for _ in self.drain():
+            pass
+
+    def resume(self) -> None:
+        self._running.set()
+
+
+class Acquisition(threading.Thread):
+    """Samples every channel on one schedule, away from the Tk main loop.
+
+    The thread runs a single event loop, the reads of all sensors overlap so
+    they share one conversion delay. In periodic mode the sensors free run
+    and a sample is only a fetch."""
+
+    def __init__(self, interval: float, channels: list[Channel] = (), periodic: bool = False,
+                 clock: Clock = None):
+        super().__init__(name="acquisition", daemon=True)
+        if interval <= 0:
+            raise ValueError(f"The sample interval has to be positive, not {interval}.")
+        self.interval = interval
+        # Only stamps the readings, the schedule itself runs on the event loop
+        self.clock = Clock() if clock is None else clock
+        self.schedule: Schedule = None
+        self.periodic = periodic
+        self._channels = list(channels)
+        self._drivers: dict[Channel, AsyncSensor] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._loop: asyncio.AbstractEventLoop = None
+        self._wakeup: asyncio.Event = None
+
+    @property
+    def channels(self) -> list[Channel]:
+        with self._lock:
+            return list(self._channels)
+
+    def add(self, channel: Channel) -> None:
+        with self._lock:
+            self._channels.append(channel)
+
+    def remove(self, channel: Channel) -> None:
+        with self._lock:
+            if channel in self._channels:
+                self._channels.remove(channel)
+        if not self.is_alive():
+            channel.sensor.close()
+
+    def driver(self, channel: Channel) -> AsyncSensor:
+        if channel not in self._drivers:
+            # A single shot conversion would not fit in a shorter interval
+            periodic = self.periodic or self.interval < channel.sensor.conversion_time
+            rate = periodic_rate(self.interval) if periodic else None
+            self._drivers[channel] = AsyncSensor(channel.sensor, periodic=rate)
+        return self._drivers[channel]
+
+    def run(self) -> None:
+        asyncio.run(self._run())
+        self._loop = None
+        for channel in self.channels:
+            self.driver(channel).close()
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # The loop's time is monotonic, wall clock steps do not move the ticks
+        self.schedule = Schedule(self.interval, self._loop.time())
+        while not self._stopped.is_set():
+            late_ticks = self.schedule.late
+            late, missed = self.schedule.tick(self._loop.time())
+            METRICS.observe("tick_jitter_seconds", late)
+            METRICS.inc("late_ticks_total", self.schedule.late - late_ticks)
+            METRICS.inc("missed_ticks_total", missed)
+            if missed > 0:
+                print(f"Acquisition fell behind, {missed} samples missed.")
+            await self.sample(self.clock.now())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(),
+                                       max(0.0, self.schedule.deadline - self._loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def sample(self, time: dt.datetime = None) -> None:
+        # Every reading of a tick carries the tick's time, however long its read took
+        if time is None:
+            time = self.clock.now()
+        channels = [channel for channel in self.channels
+                    if channel.running and channel.error is None]
+        await asyncio.gather(*(self.read(channel, time) for channel in channels))
+
+    async def read(self, channel: Channel, time: dt.datetime = None) -> None:
+        try:
+            with METRICS.stage("sensor_read"):
+                sample = await self.driver(channel).read()
+        except OSError as err:
+            # A failed I2C transaction costs one sample, not the thread
+            print(err)
+            METRICS.inc("read_errors_total")
+            return
+        except Exception as err:
+            # Anything else, e.g. a missing smbus, fails every read alike
+            print(err)
+            METRICS.inc("read_errors_total")
+            channel.error = err
+            return
+        if not channel.running:
+            # Paused while the conversion was in progress
+            return
+        channel.put(Reading(time=self.clock.now() if time is None else time,
+                            real_temp=float(sample.temperature),
+                            humidity=float(sample.humidity)))
+
+    def stop(self) -> None:
+        self._stopped.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # The loop has already finished
+                pass
@@ -2,40 +2,65 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from functools import partial
-import matplotlib.ticker as ticker
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-
 import sys
 import pathlib
-import io
 import tempfile
 import subprocess
-import datetime as dt
-import pandas as pd
 import numpy as np
 
 # Importing source code
-if len(sys.argv) > 1 and sys.argv[1] == "debug":
-    from src.sensor import get_measurement_test as get_measurement
+if "debug" in sys.argv[1:]:
+    from src.sensor import RandomSensor as Sensor
 else:
-    from src.sensor import get_measurement
+    from src.sensor import SHT31 as Sensor
 
-from src.controller import Controller, DataPoint
+from src.controller import Controller
+from src.ipc import RemoteRunner
+from src.lod import MinMaxLOD
+from src.metrics import METRICS, METRICS_PATH
+from src.render import format_time_axis
+from src.replay import ReplayRunner
+from src.runner import Runner
+from src.store import SECONDS_PER_DAY, MeasurementStore
 
 TEMPLATES = pathlib.Path("resources/templates/")
 ICONS = pathlib.Path("resources/icons/")
+PROFILE_STATS_PATH = pathlib.Path("resources/profile.pstats")
+TRACE_PATH = pathlib.Path("resources/trace.txt")
 EM_DASH = u'\u2014'
 
 
 class App(tk.Tk):
 
-    def __init__(self, controller: Controller):
+    def __init__(self, controller: Controller, remote: bool = False, chamber: str = None,
+                 interval: float = 10, periodic: bool = False):
         super().__init__()
         self.controller = controller
+        # Attach to a chamber run by the headless daemon instead of owning one
+        self.remote = remote
+        # Which of the daemon's chambers, the first one when None
+        self.chamber = chamber
         self.REFRESH_INTERVAL_MS = 10_000
+        # The GUI only follows the runner's events, it never samples itself
+        self.SAMPLE_INTERVAL_S = interval
+        # Leaves the sensor free running between samples, the daemon decides when attached
+        self.periodic = periodic
+        self.POLL_INTERVAL_MS = 1_000
+        self.METRICS_INTERVAL_MS = 10_000
+        # Buckets of the plotted lines, about the pixel columns of the graph
+        self.LOD_BUCKETS = 1024
+        self.runner: Runner | RemoteRunner | ReplayRunner = None
+        # Reviewing an archive rather than measuring
+        self.replaying = False
+        self.subscription = None
+        self.day = 1
+        self.hour = 1
+        self.paused = False
+        self.profile_path = None
+        self.poll_id = None
+        self.metrics_id = None
+        self.plot_data = None
+        self.background = None
 
         # Setting up initial params
         self.title("Environmental Chamber Control")
@@ -54,6 +79,10 @@ class App(tk.Tk):
         self.main_frame = ttk.Frame(self)
         self.main_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
 
+        if not remote and controller.session is not None:
+            # A recovered measurement continues right away
+            self.new_measurement()
+
     def _build_menu(self):
         # Adding the top most row of named buttons
         menu = tk.Menu(self, tearoff=0)
@@ -63,6 +92,8 @@ class App(tk.Tk):
         menu.add_cascade(label="Measurement", menu=self.measurement_menu)
         self.measurement_menu.add_command(label="New",
                                           command=self.new_measurement)
+        self.measurement_menu.add_command(label="Open",
+                                          command=self.open_archive)
         self.measurement_menu.add_command(label="Save",
                                           command=self.save)
         self.measurement_menu.entryconfigure("Save", state=tk.DISABLED)
@@ -86,6 +117,18 @@ class App(tk.Tk):
             label="Preview", command=self.preview_profile)
         self.profile_menu.entryconfigure("Preview")
 
+        # Captures of the runner thread, written out when switched off
+        self.debug_menu = tk.Menu(menu, tearoff=0)
+        menu.add_cascade(label="Debug", menu=self.debug_menu)
+        self.profiling = tk.BooleanVar(value=False)
+        self.debug_menu.add_checkbutton(label="Profile", variable=self.profiling,
+                                        command=self.toggle_profile)
+        self.debug_menu.entryconfigure("Profile", state=tk.DISABLED)
+        self.tracing = tk.BooleanVar(value=False)
+        self.debug_menu.add_checkbutton(label="Trace allocations", variable=self.tracing,
+                                        command=self.toggle_trace)
+        self.debug_menu.entryconfigure("Trace allocations", state=tk.DISABLED)
+
         # Adding buttons with pictures
         button_frame = ttk.Frame(self)
         button_frame.pack(side=tk.TOP, fill=tk.X, expand=False)
@@ -150,10 +193,6 @@ class App(tk.Tk):
 
         if self.measurement_name is None:
             self.measurement_name = tk.StringVar()
-            file = tempfile.NamedTemporaryFile(delete=False)
-            path = pathlib.Path(file.name)
-            file.close()
-            self.controller.measurement_path = path
             self.measurement_name.set("Untitled")
 
         ttk.Label(name_frame, textvariable=self.measurement_name,
@@ -166,6 +205,48 @@ class App(tk.Tk):
                   ).pack(side=tk.TOP, fill=tk.X)
 
     def new_measurement(self):
+        if self.remote:
+            self.runner = RemoteRunner(chamber=self.chamber)
+            try:
+                self.subscription = self.runner.subscribe()
+            except OSError as err:
+                tk.messagebox.showerror(title="Error!",
+                                        message=f"""No chamber is running on this computer. {err}""")
+                self.runner = None
+                return
+        else:
+            self.runner = Runner(
+                self.controller, Sensor(), self.SAMPLE_INTERVAL_S, periodic=self.periodic)
+            # A recovered measurement already has samples of today
+            self.subscription = self.runner.subscribe(backlog=True)
+        self._start()
+
+    def open_archive(self):
+        res = tk.filedialog.askopenfilename(initialdir=pathlib.Path().home(),
+                                            filetypes=[("zip archive", "*.zip")])
+        if res == '' or res == ():
+            return
+        path = pathlib.Path(res)
+        speed = tk.simpledialog.askfloat("Replay", "Replay speed (times real time):",
+                                         initialvalue=360.0, minvalue=1.0)
+        if speed is None:
+            return
+
+        try:
+            self.runner = ReplayRunner(self.controller, path, speed)
+        except Exception as err:
+            tk.messagebox.showerror(title="Error!",
+                                    message=f"""{path.name} is not a measurement archive. {err}""")
+            return
+        self.controller.name = path.stem
+        self.replaying = True
+        if self.measurement_name is None:
+            self.measurement_name = tk.StringVar()
+        self.measurement_name.set(path.name)
+        self.subscription = self.runner.subscribe()
+        self._start()
+
+    def _start(self):
         self._build_labels(self.main_frame)
         self.title(
             f"{self.measurement_name.get()} {EM_DASH} Environmental Chamber Control")
@@ -176,45 +257,49 @@ class App(tk.Tk):
         self.button_email.configure(state=tk.NORMAL)
 
         self.measurement_menu.entryconfigure("New", state=tk.DISABLED)
+        self.measurement_menu.entryconfigure("Open", state=tk.DISABLED)
         self.measurement_menu.entryconfigure("Save as", state=tk.NORMAL)
         self.measurement_menu.entryconfigure("Email", state=tk.NORMAL)
         self.measurement_menu.entryconfigure("Pause/Resume", state=tk.NORMAL)
+        self.debug_menu.entryconfigure("Profile", state=tk.NORMAL)
+        self.debug_menu.entryconfigure("Trace allocations", state=tk.NORMAL)
 
         self._build_graph(self.main_frame)
-        self.controller.start_t = dt.datetime.now()
-        # Set up plot to call animate() function periodically
-        self.ani = animation.FuncAnimation(
-            self.fig, partial(self.animate), interval=self.REFRESH_INTERVAL_MS, cache_frame_data=False)
+        if not self.remote:
+            file = tempfile.NamedTemporaryFile(delete=False)
+            path = pathlib.Path(file.name)
+            file.close()
+            self.runner.start(path)
+        # Follow the runner's events periodically
+        self.poll()
+        self.write_metrics()
         self.canvas.draw()
-        self.save(temp=True)
 
     def _build_graph(self, main_frame):
+        # matplotlib is only loaded once there is something to plot
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
         graph_frame = ttk.Frame(main_frame)
         graph_frame.place(relwidth=0.8, relheight=1)
         # Create a figure
         self.fig = plt.figure()
         self.ax = self.fig.add_subplot(1, 1, 1)
 
+        # Today's samples, the lines only get their level of detail
+        self.plot_data = MeasurementStore()
+        self.lods = {name: MinMaxLOD(self.LOD_BUCKETS)
+                     for name in ("real", "target", "humidity")}
         self.plot_real_temp = self.ax.plot(
-            [], [], label="Actual", color="blue")[0]
+            [], [], label="Actual", color="blue", animated=True)[0]
         self.plot_target_temp = self.ax.plot(
-            [], [], label="Target", color="red")[0]
+            [], [], label="Target", color="red", animated=True)[0]
+        # Humidity comes from the same transaction, on its own scale
+        self.ax_humidity = self.ax.twinx()
+        self.plot_humidity = self.ax_humidity.plot(
+            [], [], label="Humidity", color="green", animated=True)[0]
 
-        # Format plot
-        self.ax.xaxis.set_major_locator(ticker.MaxNLocator(12))
-        self.ax.tick_params(axis="x", rotation=45)
-        self.fig.subplots_adjust(bottom=0.30)
-        self.ax.set_title(f"{self.measurement_name.get()}"
-                          f" {EM_DASH} Day {self.controller.day}")
-        self.ax.set_xlabel("Time (hh:mm)")
-        self.ax.set_ylabel("Temperature (°C)")
-        self.ax.set_ylim([-50, 150])
-        self.ax.set_xlim([0, 3600])
-        ticks = self.ax.get_xticks()
-        self.ax.set_xticklabels(pd.to_datetime(
-            ticks, unit="s").strftime("%H:%M"))
-
-        self.ax.legend()
+        self._format_axes()
 
         # To display figure
         self.canvas = FigureCanvasTkAgg(self.fig, master=graph_frame)
@@ -225,95 +310,254 @@ class App(tk.Tk):
         toolbar.update()
         toolbar.pack(side="bottom")
 
-    def on_closing(self):
-        try:
-            self.ani.event_source.stop()
-            plt.close('all')
-        except AttributeError:
-            # Animation does not exist.
-            pass
+        # Every full redraw refreshes the background used for blitting
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _format_axes(self):
+        self.ax.tick_params(axis="x", rotation=45)
+        self.fig.subplots_adjust(bottom=0.30)
+        self.ax.set_title(f"{self.measurement_name.get()}"
+                          f" {EM_DASH} Day {self.day}")
+        self.ax.set_xlabel("Time (hh:mm)")
+        self.ax.set_ylabel("Temperature (°C)")
+        self.ax.set_ylim([-50, 150])
+        self.ax_humidity.set_ylabel("Relative humidity (%)")
+        self.ax_humidity.set_ylim([0, 100])
+        self.ax.set_xlim([0, 3600*self.hour])
+        format_time_axis(self.ax, 0, 3600*self.hour)
+
+        self._legend()
+
+    def _legend(self):
+        # The humidity line lives on the twin axes
+        self.ax.legend(handles=[self.plot_real_temp, self.plot_target_temp,
+                                self.plot_humidity])
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_lines()
 
-        if self.controller.measurement_path is not None:
+    def _draw_lines(self):
+        self.ax.draw_artist(self.plot_real_temp)
+        self.ax.draw_artist(self.plot_target_temp)
+        self.ax_humidity.draw_artist(self.plot_humidity)
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        with METRICS.stage("blit"):
+            self.canvas.restore_region(self.background)
+            self._draw_lines()
+            self.canvas.blit(self.ax.bbox)
+
+    def on_closing(self):
+        if self.poll_id is not None:
+            self.after_cancel(self.poll_id)
+        if self.metrics_id is not None:
+            self.after_cancel(self.metrics_id)
+        # pyplot is only around if a graph or preview was ever shown
+        pyplot = sys.modules.get("matplotlib.pyplot")
+        if pyplot is not None:
+            pyplot.close('all')
+
+        if self.remote:
+            # The chamber keeps running without us
+            if self.runner is not None:
+                self.runner.close()
+        elif self.replaying:
+            # Nothing new was measured, the archive stays as it was
+            self.runner.close(discard=True)
+            if self.controller.temp_save:
+                self.controller.measurement_path.unlink(missing_ok=True)
+        elif self.runner is not None:
+            temp_path = None
             if self.controller.temp_save:
-                self.save_as()
-                path = self.controller.measurement_path
-                path.unlink()
+                temp_path = self.controller.measurement_path
+                saving = self.save_as()
             else:
                 self.save()
-
-        if self.controller.partial_save is not None:
-            self.partial_save.unlink()
+                saving = True
+            session = self.controller.session
+            # Waits for the pending saves, the working copy is kept if the
+            # measurement was never saved or the save failed
+            self.runner.close(discard=saving)
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+            err = self.controller.export_error
+            if err is not None:
+                where = "" if session is None else f" in {session.root.resolve()}"
+                tk.messagebox.showerror(title="Error!",
+                                        message=f"""Saving the measurement failed. The working copy is kept{where} and is recovered on the next start. {err}""")
 
         self.quit()
         self.destroy()
 
-    def animate(self, i):
-        # Read temperature (Celsius) from TMP102
-        temp = float(round(get_measurement(), 2))
-        result = self.controller.add_data_point(temp)
+    def poll(self):
+        self.poll_id = self.after(self.POLL_INTERVAL_MS, self.poll)
+        self.runner.step()
 
-        if result == "hour_change":
-            self.ax.set_xlim([0, 3600*self.controller.hour])
-            ticks = self.ax.get_xticks()
-            self.ax.set_xticklabels(pd.to_datetime(
-                ticks, unit="s").strftime("%H:%M"))
+        updated = False
+        for event in self.subscription.drain():
+            updated = self.handle_event(event) or updated
+        if updated:
+            self.blit()
 
-            self.ax.legend()
-            self.save()
-
-        elif result == "day_change":
-            self.ax.clear()
-
-            # Format plot
-            self.ax.xaxis.set_major_locator(ticker.MaxNLocator(12))
-            self.ax.tick_params(axis="x", rotation=45)
-            self.fig.subplots_adjust(bottom=0.30)
-            self.ax.set_title(f"{self.measurement_name.get()}"
-                              f" {EM_DASH} Day {self.controller.day}")
-            self.ax.set_xlabel("Time (hh:mm)")
-            self.ax.set_ylabel("Temperature (°C)")
-            self.ax.set_ylim([-50, 150])
-            self.ax.set_xlim([0, 3600])
-            ticks = self.ax.get_xticks()
-            self.ax.set_xticklabels(pd.to_datetime(
-                ticks, unit="s").strftime("%H:%M"))
-
-            self.ax.legend()
+    def write_metrics(self):
+        self.metrics_id = self.after(self.METRICS_INTERVAL_MS, self.write_metrics)
+        try:
+            METRICS.write(METRICS_PATH)
+        except OSError as err:
+            print(err)
+
+    def handle_event(self, event: dict) -> bool:
+        # Returns whether the lines have to be redrawn
+        kind = event["type"]
+        if kind == "sample":
+            elapsed = event["elapsed"] % SECONDS_PER_DAY
+            humidity = event.get("humidity")
+            self.plot_data.append(elapsed, event["real_temp"],
+                                  event["target_temp"], humidity)
+            self.lods["real"].append(elapsed, event["real_temp"])
+            self.lods["target"].append(elapsed, event["target_temp"])
+            if humidity is not None:
+                self.lods["humidity"].append(elapsed, humidity)
+            with METRICS.stage("update_plot"):
+                self.update_plot(redraw=False)
+            return True
+
+        elif kind == "hour_change":
+            self.hour = event["hour"]
+            self.ax.set_xlim([0, 3600*self.hour])
+            format_time_axis(self.ax, 0, 3600*self.hour)
+
+            self._legend()
+            self.canvas.draw_idle()
+
+        elif kind == "day_change":
+            self.day = event["day"]
+            self.hour = event["hour"]
+            self.plot_data.clear()
+            for lod in self.lods.values():
+                lod.clear()
+            self.update_plot(redraw=False)
+            self._format_axes()
+            self.canvas.draw_idle()
+
+        elif kind == "status":
+            self.day = event["day"]
+            self.hour = event["hour"]
+            self.set_paused(event["paused"])
+            if event["profile"] is not None:
+                self.set_profile(pathlib.Path(event["profile"]))
+            if not event["temp_save"]:
+                self.measurement_name.set(event["name"])
+                self.title(
+                    f"{event['name']} {EM_DASH} Environmental Chamber Control")
+                self.button_save.configure(state=tk.NORMAL)
+                self.measurement_menu.entryconfigure("Save", state=tk.NORMAL)
+            self._format_axes()
+            self.canvas.draw_idle()
+
+        elif kind == "targets":
+            # Also when another client or the daemon loaded the profile
+            if event.get("profile") is not None:
+                self.set_profile(pathlib.Path(event["profile"]))
+            self.set_target_temps(np.array(event["target_temps"]))
+
+        elif kind == "paused":
+            self.set_paused(True)
+
+        elif kind == "resumed":
+            self.set_paused(False)
+
+        elif kind == "error":
+            tk.messagebox.showerror(title="Error!", message=event["message"])
+
+        elif kind == "mail":
+            if event["ok"]:
+                tk.messagebox.showinfo(message="Email sent successfully!")
+            else:
+                tk.messagebox.showerror(title="Error!",
+                                        message="""There was an error while sending the mail. Please check your internet connection and consider saving manually.""")
+        return False
 
-            self.save()
+    def update_plot(self, redraw=True):
+        self.plot_real_temp.set_data(*self.lods["real"].points())
+        self.plot_target_temp.set_data(*self.lods["target"].points())
+        self.plot_humidity.set_data(*self.lods["humidity"].points())
+        if redraw:
+            self.blit()
 
-        self.update_plot()
+        return (self.plot_real_temp, self.plot_target_temp, self.plot_humidity)
 
-    def update_plot(self):
-        data_point: DataPoint = self.controller.data[-1]
+    def set_target_temps(self, target_temps):
+        if self.plot_data is None:
+            # The plot does not exist yet
+            return
+        count = len(self.plot_data)
+        if count > 0:
+            self.plot_data.target_temps[:] = target_temps[-count:]
+        lod = self.lods["target"]
+        lod.clear()
+        lod.extend(self.plot_data.elapsed, self.plot_data.target_temps)
+        self.plot_target_temp.set_data(*lod.points())
+        self.blit()
+
+    def set_paused(self, paused: bool):
+        self.paused = paused
+        if paused:
+            self.button_pause.configure(image=self.button_pause.image_resume)
+        else:
+            self.button_pause.configure(image=self.button_pause.image_pause)
 
-        times, real_temps = self.plot_real_temp.get_data()
-        _, target_temps = self.plot_target_temp.get_data()
-        times = np.append(times, data_point.duration.seconds)
-        real_temps = np.append(real_temps, data_point.real_temp)
-        target_temps = np.append(target_temps, data_point.target_temp)
+    def set_profile(self, path: pathlib.Path):
+        self.profile_path = path
+        if self.profile_name is None:
+            self.profile_name = tk.StringVar()
+        self.profile_name.set(path.name)
+        self.profile_menu.entryconfigure("Edit", state=tk.NORMAL)
 
-        self.plot_real_temp.set_xdata(times)
-        self.plot_real_temp.set_ydata(real_temps)
-        self.plot_target_temp.set_xdata(times)
-        self.plot_target_temp.set_ydata(target_temps)
+    def toggle_profile(self):
+        try:
+            self.profiling.set(self.runner.profile(PROFILE_STATS_PATH))
+        except Exception as err:
+            tk.messagebox.showerror(title="Error!", message=f"Profiling failed. {err}")
+            return
+        if not self.profiling.get():
+            tk.messagebox.showinfo(message=f"Profile written to {PROFILE_STATS_PATH.resolve()}")
 
-        return (self.plot_real_temp, self.plot_target_temp)
+    def toggle_trace(self):
+        try:
+            self.tracing.set(self.runner.trace(TRACE_PATH))
+        except Exception as err:
+            tk.messagebox.showerror(title="Error!", message=f"Tracing failed. {err}")
+            return
+        if not self.tracing.get():
+            tk.messagebox.showinfo(message=f"Allocations written to {TRACE_PATH.resolve()}")
 
     def toggle_pause(self):
-        if self.controller.paused:
-            self.controller.resume()
-            self.ani.resume()
-            self.button_pause.configure(image=self.button_pause.image_pause)
+        if self.paused:
+            self.runner.resume()
         else:
-            self.ani.pause()
-            self.controller.pause()
-            self.button_pause.configure(image=self.button_pause.image_resume)
+            self.runner.pause()
 
     def get_new_profile(self):
-        target_temps = self.controller.recalculate()
-        self.plot_target_temp.set_ydata(target_temps)
-        self.after(self.REFRESH_INTERVAL_MS, self.save)
+        previous = self.controller.profile_path
+        try:
+            if self.runner is None:
+                # Edited before the measurement started, checked like a loaded one
+                self.controller.profile_path = self.profile_path
+                self.controller.recalculate()
+            else:
+                self.runner.load_profile(self.profile_path)
+        except Exception as err:
+            tk.messagebox.showerror(title="Error!",
+                                    message=f"""{self.profile_path.name} is not a valid profile. {err}""")
+            if self.runner is None:
+                self.controller.profile_path = previous
 
     def export(self):
         email = tk.simpledialog.askstring(
@@ -323,29 +567,21 @@ class App(tk.Tk):
 
         email = email.strip()
 
-        self.save()
-        err = self.controller.send_mail(address=email)
-        if err == "ok":
-            tk.messagebox.showinfo(message="Email sent successfully!")
-        elif err == "ERROR":
-            tk.messagebox.showerror(title="Error!",
-                                    message="""There was an error while sending the mail. Please check your internet connection and consider saving manually.""")
+        # The result arrives as an event once the mail is sent
+        self.runner.email(email)
 
-    def save(self, temp=False):
-        fig_buffer = io.BytesIO()
-        self.fig.savefig(fig_buffer, format='png', dpi=300)
-        self.controller.save_session(fig_buffer, temp)
+    def save(self):
+        self.runner.save()
 
     def save_as(self):
         res = tk.filedialog.asksaveasfilename(initialdir=pathlib.Path().home(),
                                               filetypes=[("zip archive", "*.zip")])
         if res == '' or res == ():
-            return
+            return False
         res = pathlib.Path(res.strip())
         res = res.with_suffix(".zip")
 
         # Update GUI
-        self.controller.measurement_path = res
         self.measurement_name.set(res.name)
         self.title(
             f"{res.name} {EM_DASH} Environmental Chamber Control")
@@ -354,15 +590,12 @@ class App(tk.Tk):
 
         # Update Figure
         self.ax.set_title(f"{res.stem}"
-                          f" {EM_DASH} Day {self.controller.day}")
-        self.ax.legend()
-
-        # Save Figure
-        fig_buffer = io.BytesIO()
-        self.fig.savefig(fig_buffer, format='png', dpi=300)
-        fig_buffer.seek(0, io.SEEK_SET)
+                          f" {EM_DASH} Day {self.day}")
+        self._legend()
+        self.canvas.draw_idle()
 
-        self.controller.save_as_session(fig_buffer)
+        self.runner.save_as(res)
+        return True
 
     def load_profile(self):
         res = tk.filedialog.askopenfilename(
@@ -371,26 +604,24 @@ class App(tk.Tk):
             return
         path = pathlib.Path(res)
 
-        # Maybe when profile is in memory do sth else
-        self.controller.profile_path = path
         try:
-            target_temps = self.controller.recalculate()
-            self.plot_target_temp.set_ydata(target_temps)
+            if self.runner is None:
+                # Checked now, applied when the measurement starts
+                self.controller.profile_path = path
+                self.controller.recalculate()
+            else:
+                self.runner.load_profile(path)
         except Exception as err:
             tk.messagebox.showerror(title="Error!",
                                     message=f"""{path.name} is not a valid profile. {err}""")
-            self.controller.profile_path = None
+            if self.runner is None:
+                self.controller.profile_path = None
             return
 
-        if self.profile_name is None:
-            self.profile_name = tk.StringVar()
-        self.profile_name.set(path.name)
-        self.profile_menu.entryconfigure("Edit", state=tk.NORMAL)
-        if self.controller.measurement_path is not None:
-            self.after(self.REFRESH_INTERVAL_MS, self.save)
+        self.set_profile(path)
 
     def preview_profile(self):
-        initial = self.controller.profile_path
+        initial = self.profile_path
         if initial is None:
             dir = TEMPLATES
         else:
@@ -409,31 +640,25 @@ class App(tk.Tk):
                                     message=f"""{path.name} is not a valid profile. {err}""")
             return
 
+        import matplotlib.pyplot as plt
         fig = plt.figure()
         ax = fig.add_subplot(1, 1, 1)
         ax.clear()
         ax.plot(duration, target,
                 label="Target", color="red")
-        ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
+        if len(duration) > 0:
+            format_time_axis(ax, duration[0], duration[-1], ticks=10)
         plt.xticks(rotation=45, ha="right")
-        ticks = ax.get_xticks()
-        ax.set_xticklabels(pd.to_datetime(
-            ticks, unit="s").strftime("%H:%M:%S"))
         plt.subplots_adjust(bottom=0.30)
         plt.title(f"Preview of {path.name}")
         plt.xlabel("Time (hh:mm)")
         plt.ylabel("Temperature (°C)")
         plt.legend()
         fig.show()
-        try:
-            self.update_plot()
-        except AttributeError:
-            # The plot does not exist yet
-            pass
 
     def edit_profile(self):
         self.process = subprocess.Popen(["firejail", "--net=none", "wps",
-                                         f"{self.controller.profile_path}"])
+                                         f"{self.profile_path}"])
         self.after(self.REFRESH_INTERVAL_MS, self.check_edited)
 
     def check_edited(self):
@@ -441,4 +666,3 @@ class App(tk.Tk):
             self.after(self.REFRESH_INTERVAL_MS, self.check_edited)
         else:
             self.get_new_profile()
-            self.update_plot()
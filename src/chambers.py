@@ -0,0 +1,112 @@
+import dataclasses
+import json
+import pathlib
+import threading
+
+from src.acquisition import Acquisition
+from src.controller import Controller
+from src.exports import DEFAULT_FORMATS, check_formats
+from src.runner import Runner
+from src.sensor import SHT31, SHT31_ADDRESS, SHT31_BUS
+
+CHAMBERS_PATH = pathlib.Path("resources/chambers.json")
+
+
+@dataclasses.dataclass
+class ChamberConfig():
+    "One channel of the registry: where its sensor is and what it follows"
+    name: str
+    bus: int = SHT31_BUS
+    address: int = SHT31_ADDRESS
+    profile: pathlib.Path = None
+    formats: tuple[str, ...] = DEFAULT_FORMATS
+
+    @classmethod
+    def from_dict(cls, config: dict):
+        address = config.get("address", SHT31_ADDRESS)
+        if isinstance(address, str):
+            # Addresses are usually written in hex, e.g. "0x44"
+            address = int(address, 0)
+        profile = config.get("profile")
+        formats = tuple(config.get("formats", DEFAULT_FORMATS))
+        check_formats(formats)
+        return cls(name=config["name"],
+                   bus=int(config.get("bus", SHT31_BUS)),
+                   address=address,
+                   profile=None if profile is None else pathlib.Path(profile),
+                   formats=formats)
+
+
+def load_chambers(path: pathlib.Path = CHAMBERS_PATH) -> list[ChamberConfig]:
+    # A list of {"name", "bus", "address", "profile", "formats"} objects,
+    # without the file there is the single chamber of the original setup
+    if not path.exists():
+        return [ChamberConfig(name="Chamber")]
+    with path.open() as file:
+        configs = [ChamberConfig.from_dict(config) for config in json.load(file)]
+
+    names = [config.name for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError("Chamber names have to be unique.")
+    sensors = [(config.bus, config.address) for config in configs]
+    if len(set(sensors)) != len(sensors):
+        raise ValueError("Two chambers share a sensor.")
+    return configs
+
+
+class Registry():
+    """The chambers run by one process.
+
+    Every chamber has its own controller, profile and session, but all the
+    sensors are sampled by the one event loop of the acquisition thread."""
+
+    def __init__(self, configs: list[ChamberConfig], interval: float, sensor_type=SHT31,
+                 periodic: bool = False):
+        self.acquisition = Acquisition(interval, periodic=periodic)
+        self.runners: dict[str, Runner] = {}
+        for config in configs:
+            controller = Controller.recover(chamber=config.name)
+            if controller is None:
+                controller = Controller(name=config.name, chamber=config.name,
+                                        profile_path=config.profile)
+            controller.export_formats = config.formats
+            if controller.profile is None and controller.profile_path is not None:
+                # Fails early on a broken profile, before anything is sampled
+                controller.recalculate()
+            sensor = sensor_type(bus=config.bus, address=config.address)
+            self.runners[config.name] = Runner(
+                controller, sensor, interval, acquisition=self.acquisition)
+        self._stopped = threading.Event()
+
+    def __getitem__(self, name: str) -> Runner:
+        return self.runners[name]
+
+    def __iter__(self):
+        return iter(self.runners.values())
+
+    def __len__(self) -> int:
+        return len(self.runners)
+
+    def start(self, directory: pathlib.Path) -> None:
+        # The working copies go to directory, one archive per chamber
+        for name, runner in self.runners.items():
+            runner.start(directory.joinpath(f"{name}.zip"))
+        self.acquisition.start()
+
+    def step(self) -> None:
+        for runner in self:
+            runner.step()
+
+    def run_forever(self, interval: float = 1.0) -> None:
+        while not self._stopped.wait(interval):
+            self.step()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def close(self, discard: bool) -> None:
+        self.acquisition.stop()
+        if self.acquisition.ident is not None:
+            self.acquisition.join()
+        for runner in self:
+            runner.close(discard=discard)
@@ -0,0 +1,53 @@
+import datetime as dt
+
+
+class Clock():
+    "The wall clock, what everything uses unless told otherwise"
+
+    def now(self) -> dt.datetime:
+        return dt.datetime.now()
+
+
+class SimulatedClock():
+    "A clock that only moves when told to, for runs faster than real time"
+
+    def __init__(self, start: dt.datetime):
+        self._now = start
+
+    def now(self) -> dt.datetime:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        self._now += dt.timedelta(seconds=seconds)
+
+
+class Schedule():
+    """Fixed cadence deadlines on a monotonic clock.
+
+    The n-th deadline is start + n*interval, so time spent sampling or saving
+    never pushes back the ones after it. A tick running so late that further
+    deadlines passed meanwhile skips them, they are counted as missed."""
+
+    def __init__(self, interval: float, start: float, tolerance: float = 0.1):
+        self.interval = interval
+        self.start = start
+        # Lateness beyond this fraction of the interval counts as a late tick
+        self.tolerance = tolerance
+        self.ticks = 0
+        self.missed = 0
+        self.late = 0
+
+    @property
+    def deadline(self) -> float:
+        return self.start + self.ticks*self.interval
+
+    def tick(self, now: float) -> tuple[float, int]:
+        # How late the tick running at now is and how many deadlines it skipped
+        late = max(0.0, now - self.deadline)
+        missed = int(late // self.interval)
+        late -= missed*self.interval
+        self.ticks += missed + 1
+        self.missed += missed
+        if late > self.tolerance*self.interval:
+            self.late += 1
+        return late, missed
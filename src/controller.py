@@ -1,89 +1,57 @@
 import datetime as dt
 import dataclasses
-import zipfile
-import io
-from email.message import EmailMessage
-import smtplib
-import json
-import openpyxl as xl
+import functools
 import pathlib
-import tempfile
-import shutil
-from typing import Generator
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+import numpy as np
+
+from src.clock import Clock
+from src.exports import DEFAULT_FORMATS
+from src.journal import Journal
+from src.metrics import METRICS
+from src.profiles import Profile, load_profile
+from src.render import RENDER_TIERS, render_day
+from src.saver import Callback, Saver
+from src.session import SESSIONS_PATH, Session
+from src.store import SECONDS_PER_DAY, MeasurementStore
 
 
-CONFIG_PATH = pathlib.Path("resources/confidential.json")
-TIME_FORMAT = "%d:%H:%M:%S"
-PROFILE_TIME_FORMAT = "%d:%H:%M"
 EM_DASH = u'\u2014'
 
 
-def skip_first(func, *args, **kwargs):
-    def wrapper(*args, **kwargs):
-        gen = func(*args, **kwargs)
-        next(gen)
-        return gen
-    return wrapper
+def apply_profile(profile: Profile | None, data: MeasurementStore) -> None:
+    if profile is None:
+        data.target_temps[:] = np.nan
+    else:
+        data.target_temps[:] = profile(data.elapsed)
 
 
-class DataPoint():
-    # duration of internal time from the beginning of measurement
-    def __init__(self, duration: dt.timedelta, real_temp: float, target_temp: float):
-        self.duration = duration
-        self.real_temp = real_temp
-        self.target_temp = target_temp
+def write_day(session: Session, day: int, data: MeasurementStore) -> None:
+    # Appends whatever rows of the day the session does not have yet
+    committed = session.rows(day)
+    if committed < len(data):
+        with METRICS.stage("write_day"):
+            session.append(day, data[committed:])
 
-    @classmethod
-    def from_str(cls, string: str):
-        duration, real_temp, target_temp = string.strip().split(",")
-        hours, minutes, seconds = duration.strip().split(":")
-        duration = dt.timedelta(hours=hours, minutes=minutes, seconds=seconds)
-        real_temp = float(real_temp)
-        target_temp = float(target_temp)
-        return cls(duration, real_temp, target_temp)
-
-    def __repr__(self):
-        return f"DataPoint(duration={repr(self.duration)}, real_temp={repr(self.real_temp)}, target_temp={repr(self.target_temp)})"
-
-    def __str__(self):
-        seconds = int(self.duration.total_seconds())
-        quot, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(quot, 60)
-        duration = f"{hours:02}:{minutes:02}:{seconds:02}"
-        return f"{duration},{self.real_temp},{self.target_temp}"
-
-
-class ProfilePoint():
-    # duration of internal time from the beginning of measurement
-    def __init__(self, duration: dt.datetime, target_temp: float):
-        self.duration = duration
-        self.target_temp = target_temp
 
-    @classmethod
-    def from_str(cls, string: str):
-        duration, target_temp = string.strip().split(",")
-        hours, minutes, _ = map(int, duration.strip().split(":"))
-        duration = dt.timedelta(hours=hours, minutes=minutes)
-        target_temp = float(target_temp)
-        return cls(duration, target_temp)
+def _time(value: str | None) -> dt.datetime | None:
+    return None if value is None else dt.datetime.fromisoformat(value)
 
-    @classmethod
-    def from_xl(cls, time: str, temp: str):
-        duration = time
-        target_temp = float(temp)
-        return cls(duration, target_temp)
 
-    def __repr__(self):
-        return f"ProfilePoint(duration={repr(self.duration)}, target_temp={repr(self.target_temp)})"
+def _isoformat(time: dt.datetime | None) -> str | None:
+    return None if time is None else time.isoformat()
 
-    def __str__(self):
-        seconds = int(self.duration.total_seconds())
-        quot, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(quot, 60)
-        duration = f"{hours:02}:{minutes:02}:{seconds:02}"
-        return f"{duration},{self.target_temp}"
+
+def _path_str(path: pathlib.Path | None) -> str | None:
+    return None if path is None else str(path)
+
+
+def write_figure(session: Session, day: int, data: MeasurementStore, title: str, dpi: int) -> None:
+    # Figures are only rendered when the data, title or resolution changed
+    if session.figure_is_current(day, title, len(data), dpi):
+        return
+    with METRICS.stage("savefig"):
+        figure = render_day(data, title, dpi)
+    session.write_figure(day, figure, title=title, rows=len(data), dpi=dpi)
 
 
 @dataclasses.dataclass
@@ -93,47 +61,79 @@ class Controller():
     prev_event_t: dt.datetime = None
     delay: dt.timedelta = dataclasses.field(default_factory=dt.timedelta)
     prev_delay: dt.timedelta = dataclasses.field(default_factory=dt.timedelta)
-    data: list[DataPoint] = dataclasses.field(default_factory=list)
+    data: MeasurementStore = dataclasses.field(default_factory=MeasurementStore)
     start_t: dt.datetime = None
     day: int = 1
     hour: int = 1
     paused: bool = False
     measurement_path: pathlib.Path = None
+    name: str = "Untitled"
+    # Channel of the chamber registry, None when running a single chamber
+    chamber: str = None
     profile_path: pathlib.Path = None
     temp_save: bool = True
-    partial_save: pathlib.Path = None
-    profiler: Generator[float | None, dt.datetime, None] = None
-
-    def add_data_point(self, real_temp: float) -> str:
-        duration = dt.datetime.now() - (self.start_t + self.delay)
-
-        if duration > (self.hour)*dt.timedelta(hours=1):
-            self.hour += 1
-            return "hour_change"
-
+    session: Session = None
+    # Where the session is created, recover only looks in SESSIONS_PATH
+    sessions: pathlib.Path = SESSIONS_PATH
+    # Everything since the last commit, replayed after a crash
+    journal: Journal = None
+    # All session I/O happens on the saver thread
+    saver: Saver = dataclasses.field(default_factory=Saver)
+    profile: Profile = None
+    render_tiers: dict[str, int] = dataclasses.field(
+        default_factory=lambda: dict(RENDER_TIERS))
+    # Formats of the data in the archive, see exports.EXPORT_FORMATS
+    export_formats: tuple[str, ...] = DEFAULT_FORMATS
+    # Every "now" of the controller, a simulated clock runs days in minutes
+    clock: Clock = dataclasses.field(default_factory=Clock)
+    # Why the last export failed, None once one succeeds
+    export_error: Exception = None
+
+    def add_data_point(self, real_temp: float, time: dt.datetime = None,
+                       humidity: float = None) -> str:
+        # time is when the reading was taken, not when it is processed
+        if time is None:
+            time = self.clock.now()
+        duration = time - (self.start_t + self.delay)
+
+        result = "ok"
         if duration > (self.day)*dt.timedelta(days=1):
             self.daily_save()
             self.hour = 1
             self.day += 1
-            return "day_change"
+            result = "day_change"
 
-        if self.profiler is not None:
-            target_temp = self.profiler.send(duration)
-        else:
-            target_temp = None
+        elif duration > (self.day - 1)*dt.timedelta(days=1) + (self.hour)*dt.timedelta(hours=1):
+            self.hour += 1
+            result = "hour_change"
+
+        target_temp = self.target_at(time)
+
+        self.data.append(duration.total_seconds(), real_temp, target_temp, humidity)
+        if self.journal is not None:
+            self.journal.write({"type": "sample",
+                                "time": time.isoformat(),
+                                "elapsed": duration.total_seconds(),
+                                "real_temp": real_temp,
+                                "target_temp": target_temp,
+                                "humidity": humidity})
 
-        data_point = DataPoint(
-            duration=duration, real_temp=real_temp, target_temp=target_temp)
-        self.data.append(data_point)
+        self.last_event_t = time
+        return result
 
-        self.last_event_t = dt.datetime.now()
-        return "ok"
+    def target_at(self, time: dt.datetime) -> float | None:
+        # What the profile asks for at a moment of the measurement
+        if self.profile is None or self.start_t is None:
+            return None
+        return self.profile.at((time - (self.start_t + self.delay)).total_seconds())
 
     def pause(self) -> None:
         self.paused = True
+        if self.journal is not None:
+            self.journal.write({"type": "pause", "paused": True})
 
     def resume(self) -> None:
-        new_delay = dt.datetime.now() - self.last_event_t
+        new_delay = self.clock.now() - self.last_event_t
 
         if self.prev_event_t == self.last_event_t:
             self.delay += new_delay - self.prev_delay
@@ -143,313 +143,272 @@ class Controller():
 
         self.prev_delay = new_delay
         self.paused = False
+        if self.journal is not None:
+            self.journal.write({"type": "resume",
+                                "paused": False,
+                                "delay": self.delay.total_seconds(),
+                                "prev_delay": self.prev_delay.total_seconds(),
+                                "prev_event_t": _isoformat(self.prev_event_t)})
 
     def recalculate(self):
-        self.profiler = self.get_profiler()
-        # Using a generator
-        # The order of recalculation matters
-        # old data -> today's data
+        self.profile = self.get_profile()
+        if self.journal is not None:
+            self.journal.write({"type": "profile",
+                                "profile_path": _path_str(self.profile_path)})
 
-        # Recalculate old data
-        if self.partial_save is not None:
-            with self.partial_save.open("r") as file:
-                lines = file.readlines()
-
-            if len(lines) != 0:
-                data = []
-                lines = lines[1:]
-                for line in lines:
-                    line = line.strip()
-                    data_point = DataPoint.from_str(line)
-                    data.append(data_point)
-
-            with self.partial_save.open("w") as file:
-                file.write("time,measurement,set_temp\n")
-                for data_point in data:
-                    data_point.target_temp = self.profiler.send(
-                        data_point.duration)
-                    file.write(f"{data_point}\n")
-
-        target_temps = []
         # Recalculate today's data
-        for data_point in self.data:
-            data_point.target_temp = self.profiler.send(data_point.duration)
-            target_temps.append(data_point.target_temp)
-
-        return target_temps
-
-    @skip_first
-    def get_profiler(self) -> float | None:
-        # Expects time values to come in a monotonically increasing order
-        # Assumes profile exists
-        path = self.profile_path
-
-        if path is None:
-            while True:
-                time = yield None
-
-        profile = self.parse_profile(path)
-        time = yield None
-
-        prev_point: ProfilePoint = None
-        profile_point = profile.pop(0)
-        while True:
-            while time > profile_point.duration:
-                if len(profile) > 0:
-                    prev_point = profile_point
-                    profile_point = profile.pop(0)
-                else:
-                    while True:
-                        if prev_point is not None:
-                            time = yield prev_point.target_temp
-                        else:
-                            time = yield None
-            if prev_point is None:
-                time = yield profile_point.target_temp
-            else:
-                # Linear interpolation of temperature
-                time_between = profile_point.duration - prev_point.duration
-                time_since = time - prev_point.duration
-                delta_temp = profile_point.target_temp - prev_point.target_temp
-                target = prev_point.target_temp + delta_temp * \
-                    (time_since/time_between)
-                time = yield target
-
-    def save_session(self, fig_buf: io.BytesIO, temporary: bool) -> IOError | None:
-        if temporary:
-            # No user saves yet
-            new_file = tempfile.NamedTemporaryFile(delete=False)
-            new_path = pathlib.Path(new_file.name)
-            new_file.close()
-            new_zip = zipfile.ZipFile(
-                new_path, 'w', compression=zipfile.ZIP_DEFLATED)
-            if zipfile.is_zipfile(self.measurement_path):
-                old_zip = zipfile.ZipFile(self.measurement_path)
-                self.write_figures(old_zip, new_zip, fig_buf)
-                old_zip.close()
-
-            self.measurement_path.unlink()
-            self.write_profile(new_zip)
-            new_zip.close()
-            self.measurement_path = pathlib.Path(new_path)
-            return
-
-        # Permanent save
-        path = self.measurement_path
-        was_zip = zipfile.is_zipfile(path)
-        if was_zip:
-            tempdir = tempfile.TemporaryDirectory()
-            temp_path = pathlib.Path(tempdir.name)
-            old_zip = pathlib.Path(shutil.move(
-                self.measurement_path, temp_path.joinpath("temp.zip")))
-            old_zip = zipfile.ZipFile(old_zip, 'r')
-
-        new_zip = zipfile.ZipFile(
-            self.measurement_path, 'w', compression=zipfile.ZIP_DEFLATED)
-
-        if was_zip:
-            self.write_figures(old_zip, new_zip, fig_buf)
-            old_zip.close()
-            tempdir.cleanup()
-
-        self.write_profile(new_zip)
-        new_zip.close()
-        return
+        self.apply_profile(self.data)
 
-        assert False, "Unreachable!"
-
-    def save_as_session(self, fig_buffer: io.BytesIO) -> IOError | None:
-        with zipfile.ZipFile(self.measurement_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
-            self.write_profile(archive)
-            archive.writestr(f"figures/day{self.day}", fig_buffer.read())
-
-            if self.partial_save is not None:
-                with self.partial_save.open() as file:
-                    lines = file.readlines()
-                if len(lines) != 0:
-                    lines = lines[1:]
-                    # Plot previous data
-                    day = 1
-                    data: list[DataPoint] = []
-                    for line in lines:
-                        data_point = DataPoint.from_str(line.strip())
-                        if data_point.duration.day <= day:
-                            data.append(data_point)
-                        else:
-                            self.plot(archive, data, day)
-                            data.clear()
-                            data.append(data_point)
-                            day += 1
-
-        self.temp_save = False
-
-    # TODO: fix or delete
-    def plot(self, dst: zipfile.ZipFile, data: list[DataPoint], day: int) -> None:
-        fig = plt.figure()
-        ax = fig.add_subplot(1, 1, 1)
-        ax.clear()
-        # Assumes data is just one day
-
-        times = []
-
-        for data_point in data:
-            quot, seconds = divmod(data_point.duration.seconds, 60)
-            hours, minutes = divmod(quot, 60)
-            time = f"{hours:02}:{minutes:02}:{seconds:02}"
-            times.append(time)
-
-        real_temps = [
-            data_point.real_temp for data_point in data]
-        target_temps = [
-            data_point.target_temp for data_point in data]
-        ax.plot(times, real_temps,
-                label="Actual", color="blue")
-        ax.plot(times, target_temps,
-                label="Target", color="red")
-        # Format plot
-        ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
-        plt.xticks(rotation=45, ha="right")
-        plt.subplots_adjust(bottom=0.30)
-        measurement_name = self.measurement_path.stem
-        plt.title(f"{measurement_name}"
-                  f"{EM_DASH} Day {day}")
-        plt.xlabel("Time (hh:mm:ss)")
-        plt.ylabel("Temperature (°C)")
-        plt.legend()
-        with dst.open(f"figures/day{day}", 'w') as file:
-            fig.savefig(file, format='png', dpi=1200)
-        plt.close(fig)
-
-    def write_figures(self, src: zipfile.ZipFile, dst: zipfile.ZipFile, fig_buf: io.BytesIO):
-        figures = src.namelist()
-        figures = [fig for fig in figures if fig.startswith("figures/")]
-        today = f"figures/day{self.day}.png"
-        if len(figures) == 0:
-            fig_buf.seek(0)
-            dst.writestr(today, fig_buf.read())
-            return
+        # Recalculate old data
+        if self.session is not None:
+            session = self.session
+            day = self.day
+            profile = self.profile
+            profile_path = self.profile_path
+            data = self.data.copy()
+
+            def job():
+                for old_day in session.days:
+                    if old_day == day:
+                        continue
+                    old_data = session.read(old_day)
+                    apply_profile(profile, old_data)
+                    session.rewrite(old_day, old_data)
+                committed = session.rows(day)
+                if committed > 0:
+                    session.rewrite(day, data[:committed])
+                if profile_path is not None:
+                    session.write_profile(profile_path)
+                session.commit()
+            self.saver.submit("recalculate", job)
+
+        return self.data.target_temps
+
+    def apply_profile(self, data: MeasurementStore) -> None:
+        apply_profile(self.profile, data)
+
+    def get_profile(self) -> Profile | None:
+        if self.profile_path is None:
+            return None
+        return load_profile(self.profile_path)
+
+    def open_session(self) -> Session:
+        if self.session is None:
+            self.session = Session.create(self.start_t, self.sessions, chamber=self.chamber)
+            if self.profile_path is not None:
+                self.session.write_profile(self.profile_path)
+            self.journal = Journal(self.session.root)
+        return self.session
+
+    def sync_journal(self) -> None:
+        # One fsync for every sample since the last call
+        if self.journal is not None:
+            self.journal.sync()
+
+    def state(self) -> dict:
+        # What a restart needs besides the samples
+        return {"name": self.name,
+                "measurement_path": _path_str(self.measurement_path),
+                "temp_save": self.temp_save,
+                "profile_path": _path_str(self.profile_path),
+                "paused": self.paused,
+                "delay": self.delay.total_seconds(),
+                "prev_delay": self.prev_delay.total_seconds(),
+                "last_event_t": _isoformat(self.last_event_t),
+                "prev_event_t": _isoformat(self.prev_event_t)}
+
+    def restore(self, state: dict) -> None:
+        # Applies a state() or any journal record holding part of one
+        for key in ("name", "temp_save", "paused"):
+            if key in state:
+                setattr(self, key, state[key])
+        for key in ("measurement_path", "profile_path"):
+            if key in state:
+                value = state[key]
+                setattr(self, key, None if value is None else pathlib.Path(value))
+        for key in ("delay", "prev_delay"):
+            if key in state:
+                setattr(self, key, dt.timedelta(seconds=state[key]))
+        for key in ("last_event_t", "prev_event_t"):
+            if key in state:
+                setattr(self, key, _time(state[key]))
 
-        for fig in figures:
-            if fig == today:
-                fig_buf.seek(0)
-                dst.writestr(today, fig_buf.read())
-            else:
-                dst.writestr(fig, src.read(fig))
-
-    def write_profile(self, new_file: zipfile.ZipFile):
-        if self.partial_save is None:
-            buffer = io.StringIO()
-            buffer.write("duration,measurement,set_temp\n")
-            for data_point in self.data:
-                buffer.write(f"{data_point}\n")
-            buffer.seek(0, io.SEEK_SET)
-            new_file.writestr("measurement.csv", buffer.read())
-            buffer.close()
+    @classmethod
+    def recover(cls, chamber: str = None):
+        "Rebuilds the controller of a session that was never closed, if any"
+        # Opening drops the rows of a checkpoint the crash cut short, the
+        # journal still has them
+        session = Session.unfinished(chamber)
+        if session is None:
+            return None
+        controller = cls(start_t=dt.datetime.fromisoformat(session.manifest["start_t"]),
+                         chamber=chamber, session=session)
+        controller.restore(session.manifest.get("state", {}))
+
+        # Only the last committed day is read, older days stay on disk
+        day = max(session.days, default=1)
+        data = session.read(day)
+        controller.data.extend(data.elapsed, data.real_temps,
+                               data.target_temps, data.humidities)
+        last = float(data.elapsed[-1]) if len(data) > 0 else 0.0
+
+        # The journal holds what happened after the last commit
+        for record in Journal.replay(session.root):
+            if record["type"] != "sample":
+                controller.restore(record)
+                continue
+            elapsed = record["elapsed"]
+            if elapsed <= last:
+                continue
+            last = elapsed
+            sample_day = max(1, int(np.ceil(elapsed / SECONDS_PER_DAY)))
+            if sample_day > day:
+                # The crash came after a day change the saver never wrote
+                write_day(session, day, controller.data)
+                controller.data.clear()
+                day = sample_day
+            controller.data.append(elapsed, record["real_temp"],
+                                   record["target_temp"], record["humidity"])
+            controller.last_event_t = _time(record["time"])
+
+        controller.day = day
+        controller.hour = max(1, int(np.ceil((last - (day - 1)*SECONDS_PER_DAY) / 3600)))
+        session.commit()
 
+        try:
+            controller.profile = controller.get_profile()
+        except OSError:
+            # The original is gone, the session keeps a copy
+            if session.manifest["profile"] is not None:
+                controller.profile_path = session.root.joinpath(session.manifest["profile"])
+                controller.profile = controller.get_profile()
+        controller.journal = Journal(session.root)
+        return controller
+
+    def save_session(self, export: bool = False, on_done: Callback = None,
+                     path: pathlib.Path = None, name: str = None) -> None:
+        # Snapshot on the calling thread, render and write on the saver thread.
+        # path and name are those of a save as that has not succeeded yet
+        session = self.open_session()
+        journal = self.journal
+        day = self.day
+        data = self.data.copy()
+        state = self.state()
+        # The journal so far is covered by this save's commit
+        generation = journal.rotate()
+        name = self.name if name is None else name
+        title = functools.partial(self.title, name=name)
+        tiers = dict(self.render_tiers)
+        if not export:
+            path = None
+        elif path is None:
+            path = self.measurement_path
+        formats = tuple(self.export_formats)
+        chamber = self.chamber
+
+        def commit():
+            session.manifest["state"] = state
+            with METRICS.stage("commit"):
+                session.commit()
+            journal.release(generation)
+
+        def job():
+            # Only the samples since the last save and today's figure are written
+            write_day(session, day, data)
+            if path is None:
+                write_figure(session, day, data, title(day), tiers["checkpoint"])
+                commit()
+                return
+
+            write_figure(session, day, data, title(day), tiers["export"])
+            # Closed days are rendered once, unless renamed or recalculated
+            for old_day in session.days:
+                if old_day != day:
+                    old_data = session.read(old_day)
+                    write_figure(session, old_day, old_data,
+                                 title(old_day), tiers["final"])
+            commit()
+            try:
+                with METRICS.stage("export"):
+                    session.export(path, formats)
+            except Exception as err:
+                self.export_error = err
+                raise
+            self.export_error = None
+            METRICS.set("archive_bytes", path.stat().st_size, chamber=chamber)
+
+        if export:
+            self.saver.submit("export", job, on_done,
+                              supersedes=("checkpoint",))
         else:
-            with self.partial_save.open("r") as file:
-                lines = file.readlines()
-            if len(lines == 0):
-                lines.append("duration,measurement,set_temp")
-
-            for data_point in self.data:
-                lines.append(f"{data_point}")
-            new_file.writestr("measurement.csv", "\n".join(lines))
+            self.saver.submit("checkpoint", job, on_done)
+
+    def save_as_session(self, path: pathlib.Path = None, on_done: Callback = None) -> None:
+        # The new name and path only stick once the archive is written there,
+        # a failed save leaves Save pointing where it did before
+        name = self.name if path is None else path.stem
+        path = self.measurement_path if path is None else path
+
+        def done(err):
+            if err is None:
+                self.measurement_path = path
+                self.name = name
+                self.temp_save = False
+                if self.journal is not None:
+                    self.journal.write({"type": "name",
+                                        "name": name,
+                                        "measurement_path": _path_str(path),
+                                        "temp_save": False})
+            if on_done is not None:
+                on_done(err)
+        self.save_session(export=True, on_done=done, path=path, name=name)
+
+    def export_session(self, on_done: Callback = None) -> None:
+        self.save_session(export=True, on_done=on_done)
+
+    def close_session(self, discard: bool) -> None:
+        # A pending export has to finish before anything can be discarded
+        self.saver.wait()
+        # Without the archive the working copy is all there is, it stays
+        # unfinished so the next start recovers it
+        keep = discard and self.export_error is not None
+        if self.session is not None and (not discard or keep):
+            # Nothing is left only in the journal
+            self.save_session()
+            self.saver.wait()
+        if self.session is None:
+            return
+        if keep:
+            self.journal.close()
+        elif discard:
+            self.journal.close()
+            self.session.discard()
+        else:
+            self.session.close()
+            self.journal.close(remove=True)
+        self.session = None
+        self.journal = None
 
-        if self.profile_path is not None:
-            new_file.write(self.profile_path, self.profile_path.name)
+    def title(self, day: int, name: str = None) -> str:
+        return f"{self.name if name is None else name} {EM_DASH} Day {day}"
 
     def daily_save(self):
-        if self.partial_save is None:
-            temp_file, path = tempfile.mkstemp()
-            temp_file.write("duration,measurement,set_temp\n")
-            temp_file.close()
-            self.partial_save = pathlib.Path(path)
-
-        with self.partial_save.open("a") as file:
-            for data_point in self.data:
-                file.write(f"{data_point}\n")
-
-    def send_mail(self, address: str) -> str:
-        # Load confidential data from config file
-        with CONFIG_PATH.open() as file:
-            config = json.load(file)
-
-        # Create the email message
-        now = dt.datetime.now()
-        msg = EmailMessage()
-        msg.set_content("Environmental chamber measurement from " +
-                        now.strftime("%d/%m/%Y, %H:%M"))
-        msg['Subject'] = "ENV chamber " + now.strftime("%d/%m/%Y, %H:%M")
-        msg['From'] = config['EMAIL']
-        msg['To'] = address
-
-        # Add attachment to the email
-        try:
-            if self.temp_save:
-                filename = "attachment.zip"
-            else:
-                filename = self.measurement_path.name
-            with self.measurement_path.open('rb') as fb:
-                prof = fb.read()
-            msg.add_attachment(prof, maintype="Content-Disposition",
-                               subtype="zip", filename=filename)
-        except Exception as err:
-            print(err)
-            return "ERROR"
-
-        # Connect to the mailing server and send the email
-        try:
-            with smtplib.SMTP_SSL(config['MAIL_SERVER'], 465) as smtp:
-                smtp.login(config['EMAIL'], config['PASSWORD'])
-                smtp.send_message(msg)
-        except Exception as err:
-            print(err)
-            return "ERROR"
-
-        return "ok"
+        session = self.open_session()
+        day = self.day
+        data = self.data.copy()
+        title = self.title(day)
+        dpi = self.render_tiers["final"]
+
+        def job():
+            write_day(session, day, data)
+            # The closed day gets its final figure
+            write_figure(session, day, data, title, dpi)
+            session.commit()
+        self.saver.submit(f"day{day}", job)
+
+        # From now on the data only holds the new day
+        self.data.clear()
 
     def preview_profile(self, path):
-        duration = []
-        target = []
-        profile = self.parse_profile(path)
-
-        for point in profile:
-            target.append(point.target_temp)
-            # dur = int(point.duration.total_seconds())
-            # quot = dur // 60
-            # hours, minutes = divmod(quot, 60)
-            # duration.append(f"{hours:02}:{minutes:02}")
-            duration.append(int(point.duration.total_seconds()))
-
-        return duration, target
-
-    def parse_profile(self, path: pathlib.Path) -> [ProfilePoint]:
-        profile: [ProfilePoint] = []
-        file_format = path.suffix
-
-        if file_format == ".csv":
-            with path.open() as file:
-                # Skip header
-                next(file)
-                for line in file:
-                    line = line.strip()
-                    profile_point = ProfilePoint.from_str(line)
-                    profile.append(profile_point)
-
-        elif file_format == ".xlsx":
-            wb = xl.load_workbook(filename=path, data_only=True)
-            ws = wb.active
-            rows = iter(ws)
-            next(rows)
-            for row in rows:
-                time = row[0].value
-                temp = row[1].value
-                if time is None or temp is None:
-                    break
-                point = ProfilePoint.from_xl(time=time, temp=temp)
-                profile.append(point)
-        else:
-            raise ValueError(f"Unsupported file format {file_format} for a profile."
-                             f"Supported formats are '.csv' and '.xlsx'.")
-        return profile
+        profile = load_profile(path)
+        return profile.durations, profile.target_temps
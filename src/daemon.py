@@ -0,0 +1,83 @@
+import http.server
+import pathlib
+import signal
+import tempfile
+import threading
+
+from src.chambers import Registry, load_chambers
+from src.ipc import ADDRESS, SampleServer
+from src.metrics import METRICS, METRICS_ADDRESS, Metrics
+
+SAMPLE_INTERVAL_S = 10
+POLL_INTERVAL_S = 1.0
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the output
+        pass
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    "Serves the metrics at /metrics for a local Prometheus scraper"
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, metrics: Metrics = METRICS, address: tuple[str, int] = METRICS_ADDRESS):
+        super().__init__(address, _MetricsHandler)
+        self.metrics = metrics
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever,
+                                  name="metrics", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main(debug: bool = False, periodic: bool = False,
+         interval: float = SAMPLE_INTERVAL_S, address: pathlib.Path = ADDRESS,
+         metrics_address: tuple[str, int] = METRICS_ADDRESS) -> None:
+    # Runs the chambers without a display, GUIs attach through the server
+    if debug:
+        from src.sensor import RandomSensor as Sensor
+    else:
+        from src.sensor import SHT31 as Sensor
+
+    # Periodic mode leaves the sensors free running between samples
+    registry = Registry(load_chambers(), interval,
+                        sensor_type=Sensor, periodic=periodic)
+    server = SampleServer(registry.runners, address)
+    # Scraped by a local Prometheus at /metrics
+    metrics = MetricsServer(address=metrics_address)
+
+    def stop(signum, frame):
+        registry.stop()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    registry.start(pathlib.Path(tempfile.mkdtemp()))
+    server.start()
+    metrics.start()
+    try:
+        registry.run_forever(POLL_INTERVAL_S)
+    finally:
+        server.stop()
+        metrics.stop()
+        # The sessions stay on disk, nobody has chosen where to save them
+        registry.close(discard=False)
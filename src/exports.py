@@ -0,0 +1,86 @@
+import importlib.util
+import io
+from typing import BinaryIO, Callable, Iterable
+
+import numpy as np
+
+from src.store import CSV_HEADER, MeasurementStore
+
+COLUMNS = ("elapsed", "real_temp", "target_temp", "humidity")
+# Written into every archive unless asked otherwise, CSV for compatibility
+DEFAULT_FORMATS = ("npz", "csv")
+
+
+def _columns(days: Iterable[MeasurementStore]) -> dict[str, np.ndarray]:
+    days = list(days)
+    if len(days) == 0:
+        return {name: np.empty(0) for name in COLUMNS}
+    return {"elapsed": np.concatenate([data.elapsed for data in days]),
+            "real_temp": np.concatenate([data.real_temps for data in days]),
+            "target_temp": np.concatenate([data.target_temps for data in days]),
+            "humidity": np.concatenate([data.humidities for data in days])}
+
+
+def write_csv(file: BinaryIO, days: Iterable[MeasurementStore]) -> None:
+    with io.TextIOWrapper(file, encoding="utf-8", newline="") as buffer:
+        buffer.write(CSV_HEADER)
+        for data in days:
+            data.write_csv(buffer)
+
+
+def write_npz(file: BinaryIO, days: Iterable[MeasurementStore]) -> None:
+    np.savez(file, **_columns(days))
+
+
+def _table(days: Iterable[MeasurementStore]):
+    import pyarrow as pa
+    return pa.table(_columns(days))
+
+
+def write_parquet(file: BinaryIO, days: Iterable[MeasurementStore]) -> None:
+    import pyarrow.parquet as pq
+    pq.write_table(_table(days), file, compression="zstd")
+
+
+def write_feather(file: BinaryIO, days: Iterable[MeasurementStore]) -> None:
+    import pyarrow.feather as feather
+    feather.write_feather(_table(days), file, compression="zstd")
+
+
+def read_npz(file: BinaryIO) -> MeasurementStore:
+    with np.load(file) as columns:
+        return MeasurementStore.from_columns(*(columns[name] for name in COLUMNS))
+
+
+def read_arrow(file: BinaryIO, fmt: str) -> MeasurementStore:
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(file)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(file)
+    return MeasurementStore.from_columns(
+        *(table.column(name).to_numpy() for name in COLUMNS))
+
+
+# Archive member, writer and the modules it needs, by format
+EXPORT_FORMATS: dict[str, tuple[str, Callable[[BinaryIO, Iterable[MeasurementStore]], None], tuple[str, ...]]] = {
+    "csv": ("measurement.csv", write_csv, ()),
+    "npz": ("measurement.npz", write_npz, ()),
+    "parquet": ("measurement.parquet", write_parquet, ("pyarrow",)),
+    "feather": ("measurement.feather", write_feather, ("pyarrow",)),
+}
+
+
+def available_formats() -> list[str]:
+    # pyarrow is optional, the formats needing it are only offered when installed
+    return [fmt for fmt, (_, _, modules) in EXPORT_FORMATS.items()
+            if all(importlib.util.find_spec(module) is not None for module in modules)]
+
+
+def check_formats(formats: Iterable[str]) -> None:
+    for fmt in formats:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt}.")
+        if fmt not in available_formats():
+            raise ImportError(f"Exporting {fmt} needs {', '.join(EXPORT_FORMATS[fmt][2])}.")
@@ -0,0 +1,205 @@
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import threading
+
+from src.runner import Runner, Subscription
+
+# A unix socket only its owner may connect to, the commands write files
+ADDRESS = pathlib.Path("resources/chamber.sock")
+# A day of 10 s samples plus room for a slow client
+SUBSCRIBER_QUEUE = 20_000
+# Requests a client may make, with the argument converters
+COMMANDS = {
+    "chambers": (),
+    "status": (),
+    "pause": (),
+    "resume": (),
+    "load_profile": (pathlib.Path,),
+    "save": (),
+    "save_as": (pathlib.Path,),
+    "email": (str,),
+    "profile": (pathlib.Path,),
+    "trace": (pathlib.Path,),
+}
+
+
+def _connect(address: pathlib.Path) -> socket.socket:
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(str(address))
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+
+def _send(file, message: dict) -> None:
+    file.write(json.dumps(message).encode() + b"\n")
+    file.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # One JSON request per line, answered with one JSON line, except for
+    # subscribe which turns the connection into a stream of events
+
+    def handle(self):
+        runners: dict[str, Runner] = self.server.runners
+        for line in self.rfile:
+            request = json.loads(line)
+            command = request.get("command")
+            # Without a chamber the request goes to the first one
+            chamber = request.get("chamber") or next(iter(runners))
+            if chamber not in runners:
+                _send(self.wfile, {"error": f"Unknown chamber {chamber}."})
+                continue
+            runner = runners[chamber]
+            if command == "subscribe":
+                self.stream(runner)
+                return
+            if command == "chambers":
+                _send(self.wfile, {"result": list(runners)})
+                continue
+
+            if command not in COMMANDS:
+                _send(self.wfile, {"error": f"Unknown command {command}."})
+                continue
+            try:
+                args = [convert(arg) for convert, arg in
+                        zip(COMMANDS[command], request.get("args", []))]
+                result = runner.call(getattr(runner, command), *args)
+            except Exception as err:
+                _send(self.wfile, {"error": str(err)})
+            else:
+                _send(self.wfile, {"result": result})
+
+    def stream(self, runner: Runner):
+        subscription = runner.call(runner.subscribe, True, SUBSCRIBER_QUEUE)
+        try:
+            while not subscription.closed and not self.server.stopped:
+                event = subscription.get(timeout=1.0)
+                if event is not None:
+                    _send(self.wfile, event)
+        except OSError:
+            # The client went away
+            pass
+        finally:
+            runner.unsubscribe(subscription)
+
+
+class SampleServer(socketserver.ThreadingUnixStreamServer):
+    "Serves the events and controls of the runners to the user's own clients"
+    daemon_threads = True
+
+    def __init__(self, runners: dict[str, Runner], address: pathlib.Path = ADDRESS):
+        super().__init__(str(address), _Handler)
+        self.runners = runners
+        self.stopped = False
+
+    def server_bind(self) -> None:
+        # A socket left by a killed daemon would fail the bind
+        path = pathlib.Path(self.server_address)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        # Private from the start, not only after the chmod
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(path, 0o600)
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever,
+                                  name="ipc", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stopped = True
+        self.shutdown()
+        self.server_close()
+        pathlib.Path(self.server_address).unlink(missing_ok=True)
+
+
+class RemoteRunner():
+    """Runner interface of a chamber served by another process.
+
+    Events arrive on a reader thread, so step() has nothing to do. Closing
+    only detaches, the chamber keeps running."""
+
+    def __init__(self, address: pathlib.Path = ADDRESS, chamber: str = None):
+        self.address = address
+        self.chamber = chamber
+        self._stream: socket.socket = None
+
+    def start(self, measurement_path: pathlib.Path = None) -> None:
+        pass
+
+    def step(self) -> None:
+        pass
+
+    def subscribe(self, backlog: bool = True, maxsize: int = 0) -> Subscription:
+        subscription = Subscription(maxsize)
+        self._stream = _connect(self.address)
+        file = self._stream.makefile("rwb")
+        _send(file, {"command": "subscribe", "chamber": self.chamber})
+
+        def read():
+            try:
+                for line in file:
+                    subscription.put(json.loads(line))
+            except OSError:
+                pass
+            subscription.put({"type": "error",
+                              "message": "Lost the connection to the chamber."})
+            subscription.closed = True
+        threading.Thread(target=read, name="ipc-client", daemon=True).start()
+        return subscription
+
+    def request(self, command: str, *args):
+        with _connect(self.address) as connection:
+            file = connection.makefile("rwb")
+            _send(file, {"command": command, "chamber": self.chamber,
+                         "args": [str(arg) for arg in args]})
+            reply = json.loads(file.readline())
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def chambers(self) -> list[str]:
+        return self.request("chambers")
+
+    def status(self) -> dict:
+        return self.request("status")
+
+    def pause(self) -> None:
+        self.request("pause")
+
+    def resume(self) -> None:
+        self.request("resume")
+
+    def load_profile(self, path: pathlib.Path) -> None:
+        self.request("load_profile", path.resolve())
+
+    def save(self) -> None:
+        self.request("save")
+
+    def save_as(self, path: pathlib.Path) -> None:
+        self.request("save_as", path.resolve())
+
+    def email(self, address: str) -> None:
+        self.request("email", address)
+
+    def profile(self, path: pathlib.Path) -> bool:
+        return self.request("profile", path.resolve())
+
+    def trace(self, path: pathlib.Path) -> bool:
+        return self.request("trace", path.resolve())
+
+    def close(self, discard: bool = False) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
@@ -0,0 +1,92 @@
+import json
+import os
+import pathlib
+import re
+import threading
+from typing import Iterator
+
+from src.session import _fsync_dir
+
+JOURNAL = "journal.log"
+_ROTATED = re.compile(r"journal\.(\d+)\.log")
+
+
+def _rotated(root: pathlib.Path) -> list[tuple[int, pathlib.Path]]:
+    parts = []
+    for path in root.iterdir():
+        match = _ROTATED.fullmatch(path.name)
+        if match is not None:
+            parts.append((int(match.group(1)), path))
+    return sorted(parts)
+
+
+class Journal():
+    """Append-only record of what happened since the last session commit.
+
+    Records are JSON lines, buffered and made durable together by sync() so
+    a batch of samples costs one fsync. Every checkpoint rotates the journal
+    and the rotated part is deleted once the commit covering it is on disk."""
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._generation = max((number for number, _ in _rotated(root)), default=0)
+        self._file = root.joinpath(JOURNAL).open("ab")
+        self._dirty = False
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record).encode() + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._dirty = True
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def rotate(self) -> int:
+        # Whatever was written so far is covered by the next commit
+        with self._lock:
+            self._sync()
+            self._file.close()
+            self._generation += 1
+            os.replace(self.root.joinpath(JOURNAL),
+                       self.root.joinpath(f"journal.{self._generation}.log"))
+            _fsync_dir(self.root)
+            self._file = self.root.joinpath(JOURNAL).open("ab")
+            return self._generation
+
+    def release(self, generation: int) -> None:
+        # Called once the commit of that rotation is durable
+        for number, path in _rotated(self.root):
+            if number <= generation:
+                path.unlink(missing_ok=True)
+
+    def close(self, remove: bool = False) -> None:
+        with self._lock:
+            self._sync()
+            self._file.close()
+        if remove:
+            self.release(self._generation)
+            self.root.joinpath(JOURNAL).unlink(missing_ok=True)
+
+    @staticmethod
+    def replay(root: pathlib.Path) -> Iterator[dict]:
+        # Oldest first, a torn last line ends its part of the journal
+        paths = [path for _, path in _rotated(root)]
+        paths.append(root.joinpath(JOURNAL))
+        for path in paths:
+            if not path.exists():
+                continue
+            with path.open("rb") as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        break
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, buckets: int) -> np.ndarray:
+    # Indices of the lowest and highest sample of every bucket of x,
+    # expects x to be sorted
+    count = len(x)
+    if count <= 2*buckets or x[-1] <= x[0]:
+        return np.arange(count)
+
+    width = (x[-1] - x[0]) / buckets
+    bucket = np.minimum(((x - x[0]) / width).astype(np.int64), buckets - 1)
+    first = np.empty(count, dtype=bool)
+    first[0] = True
+    np.not_equal(bucket[1:], bucket[:-1], out=first[1:])
+    starts = np.flatnonzero(first)
+    group = np.cumsum(first) - 1
+
+    # Gaps never win, unless the whole bucket is one
+    missing = np.isnan(y)
+    lows = np.lexsort((np.where(missing, np.inf, y), group))[starts]
+    highs = np.lexsort((np.where(missing, np.inf, -y), group))[starts]
+    return np.union1d(lows, highs)
+
+
+def decimate(x: np.ndarray, *columns: np.ndarray, buckets: int) -> np.ndarray:
+    # Indices keeping the extremes of every column, so all columns
+    # can still share one x
+    indices = [minmax_indices(x, y, buckets) for y in columns]
+    return np.unique(np.concatenate(indices)) if len(indices) > 0 else np.arange(len(x))
+
+
+class MinMaxLOD():
+    """Lowest and highest sample of every bucket of a growing series.
+
+    Updated one sample at a time as they arrive. Whenever the series outgrows
+    the buckets they double in width, so at most two points per bucket reach
+    matplotlib however long the day runs, and short excursions survive as the
+    extreme of their bucket."""
+
+    def __init__(self, buckets: int = 1024, width: float = 1.0):
+        # An even number of buckets, so pairs can be merged
+        self.buckets = buckets + buckets % 2
+        self.initial_width = width
+        self.clear()
+
+    def clear(self) -> None:
+        self.width = self.initial_width
+        # Each row is the (x, y) of a bucket's extreme, NaN while empty
+        self._lows = np.full((self.buckets, 2), np.nan)
+        self._highs = np.full((self.buckets, 2), np.nan)
+
+    def append(self, x: float, y: float) -> None:
+        if y != y:
+            # Missing values are not plotted anyway
+            return
+        bucket = int(x // self.width)
+        while bucket >= self.buckets:
+            self._coarsen()
+            bucket = int(x // self.width)
+
+        low = self._lows[bucket]
+        if not low[1] <= y:
+            low[0], low[1] = x, y
+        high = self._highs[bucket]
+        if not high[1] >= y:
+            high[0], high[1] = x, y
+
+    def extend(self, x: np.ndarray, y: np.ndarray) -> None:
+        for x_, y_ in zip(x.tolist(), y.tolist()):
+            self.append(x_, y_)
+
+    def _coarsen(self) -> None:
+        half = self.buckets // 2
+        for extremes, better in ((self._lows, np.less), (self._highs, np.greater)):
+            pairs = extremes.reshape(half, 2, 2)
+            left, right = pairs[:, 0], pairs[:, 1]
+            take_right = np.isnan(left[:, 1]) | better(right[:, 1], left[:, 1])
+            merged = np.where(take_right[:, None], right, left)
+            extremes[:half] = merged
+            extremes[half:] = np.nan
+        self.width *= 2
+
+    def points(self) -> tuple[np.ndarray, np.ndarray]:
+        occupied = ~np.isnan(self._lows[:, 1])
+        lows = self._lows[occupied]
+        highs = self._highs[occupied]
+        # Within a bucket the extremes are drawn in the order they happened
+        low_first = (lows[:, 0] <= highs[:, 0])[:, None]
+        points = np.stack([np.where(low_first, lows, highs),
+                           np.where(low_first, highs, lows)], axis=1).reshape(-1, 2)
+        return points[:, 0], points[:, 1]
@@ -0,0 +1,342 @@
+import base64
+import json
+import os
+import pathlib
+import queue
+import threading
+import time
+import uuid
+from typing import Iterator
+
+from src.metrics import METRICS
+from src.session import atomic_write
+
+CONFIG_PATH = pathlib.Path("resources/confidential.json")
+OUTBOX_PATH = pathlib.Path("resources/outbox")
+# Larger archives go out in parts, base64 adds a third and servers refuse ~25 MB
+MAX_ATTACHMENT = 15_000_000
+# Beyond that many parts only the summary is mailed
+MAX_PARTS = 8
+# Waits between attempts double from the first up to the last
+RETRY_DELAY_S = 30
+MAX_RETRY_DELAY_S = 3600
+MAX_ATTEMPTS = 10
+SMTP_TIMEOUT_S = 60
+# A multiple of 57 bytes, which base64 turns into one 76 character line
+CHUNK = 57 * 1024
+
+
+def load_config(path: pathlib.Path = CONFIG_PATH) -> dict:
+    with path.open() as file:
+        config = json.load(file)
+    # The original setup, implicit TLS on 465 with a login. A local debug
+    # server takes e.g. "PORT": 8025, "SECURITY": "none" and no password
+    config.setdefault("PORT", 465)
+    config.setdefault("SECURITY", "ssl")
+    if config["SECURITY"] not in ("ssl", "starttls", "none"):
+        raise ValueError(f"Unknown mail security {config['SECURITY']}.")
+    return config
+
+
+def summarize(archive: pathlib.Path) -> str:
+    # A few lines about the measurement, for mails without the whole archive
+    import numpy as np
+    from src.replay import load_archive
+
+    data, profile = load_archive(archive)
+    if len(data) == 0:
+        return "The measurement has no samples."
+    real = data.real_temps
+    lines = [f"Samples: {len(data)} over {data.elapsed[-1] / 3600:.1f} hours",
+             f"Temperature: {np.nanmin(real):.2f} to {np.nanmax(real):.2f} °C"]
+    if not np.all(np.isnan(data.humidities)):
+        lines.append(f"Humidity: {np.nanmin(data.humidities):.1f} to "
+                     f"{np.nanmax(data.humidities):.1f} %")
+    if profile is not None:
+        error = np.abs(real - data.target_temps)
+        lines.append(f"Profile: {profile}, deviation mean {np.nanmean(error):.2f} °C, "
+                     f"max {np.nanmax(error):.2f} °C")
+    return "\n".join(lines)
+
+
+def _param(name: str, value: str) -> str:
+    import email.utils
+    if value.isascii():
+        return f'{name}="{value}"'
+    return f"{name}*={email.utils.encode_rfc2231(value, 'utf-8')}"
+
+
+def _copy(src: pathlib.Path, offset: int, length: int, dst: pathlib.Path) -> None:
+    with src.open("rb") as source, dst.open("wb") as file:
+        source.seek(offset)
+        while length > 0:
+            chunk = source.read(min(CHUNK * 16, length))
+            if len(chunk) == 0:
+                break
+            file.write(chunk)
+            length -= len(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _base64_lines(data: bytes) -> bytes:
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+class Mailer(threading.Thread):
+    """Sends the mails of the outbox in the background.
+
+    Every mail is a JSON file in the outbox with its attachment next to it,
+    so queued mails survive a restart. Whatever is due goes out over one
+    connection, the attachments streamed from disk. Failed mails wait twice
+    as long each attempt. Results are queued for the runner like the saver's."""
+
+    def __init__(self, root: pathlib.Path = OUTBOX_PATH, config_path: pathlib.Path = CONFIG_PATH):
+        super().__init__(name="mailer", daemon=True)
+        self.root = root
+        self.config_path = config_path
+        self._config: dict = None
+        self._pending: dict[str, dict] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._starting = False
+        # The mail, the error if any and whether it is retried
+        self.results: queue.Queue[tuple[dict, Exception | None, bool]] = queue.Queue()
+
+    def submit(self, to: list[str], subject: str, body: str,
+               archive: pathlib.Path = None, filename: str = None) -> None:
+        # Copies the archive, so later saves can replace it meanwhile
+        self.root.mkdir(parents=True, exist_ok=True)
+        size = 0 if archive is None else archive.stat().st_size
+        parts = max(1, -(-size // MAX_ATTACHMENT))
+        if parts > 1:
+            body = f"{body}\n\n{summarize(archive)}"
+        if parts > MAX_PARTS:
+            body += f"\n\nThe archive is {size / 1e6:.0f} MB, too large to mail."
+            archive = None
+            parts = 1
+
+        group = f"{time.time_ns()}"
+        mails = []
+        for part in range(1, parts + 1):
+            mail = {"id": f"{group}_{part:03}",
+                    "to": to,
+                    "subject": subject if parts == 1 else f"{subject} ({part}/{parts})",
+                    "body": body,
+                    "attachment": None,
+                    "filename": filename if parts == 1 else f"{filename}.{part:03}",
+                    "part": part,
+                    "parts": parts,
+                    "attempts": 0,
+                    "next_try": time.time()}
+            if archive is not None:
+                # The parts join back with cat
+                mail["attachment"] = f"{mail['id']}.bin"
+                _copy(archive, (part - 1)*MAX_ATTACHMENT, MAX_ATTACHMENT,
+                      self.root.joinpath(mail["attachment"]))
+            self._write(mail)
+            mails.append(mail)
+
+        with self._condition:
+            for mail in mails:
+                self._pending[mail["id"]] = mail
+            self._condition.notify_all()
+        self._start()
+
+    def resume(self) -> None:
+        # Mails a previous run queued go out again
+        if self.root.exists() and any(self.root.glob("*.json")):
+            self._start()
+
+    def _start(self) -> None:
+        # Submitted from the runner and the IPC threads, only one starts it
+        with self._condition:
+            if not self._starting:
+                self._starting = True
+                self.start()
+
+    def _write(self, mail: dict) -> None:
+        atomic_write(self.root.joinpath(f"{mail['id']}.json"), json.dumps(mail).encode())
+
+    def _remove(self, mail: dict) -> None:
+        if mail["attachment"] is not None:
+            self.root.joinpath(mail["attachment"]).unlink(missing_ok=True)
+        self.root.joinpath(f"{mail['id']}.json").unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*.json"):
+            try:
+                mail = json.loads(path.read_text())
+            except ValueError:
+                continue
+            with self._condition:
+                self._pending.setdefault(mail["id"], mail)
+
+    def config(self) -> dict:
+        if self._config is None:
+            self._config = load_config(self.config_path)
+        return self._config
+
+    def run(self) -> None:
+        self._load()
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.time()
+                    due = [mail for _, mail in sorted(self._pending.items())
+                           if mail["next_try"] <= now]
+                    if len(due) > 0:
+                        break
+                    next_try = min((mail["next_try"] for mail in self._pending.values()),
+                                   default=None)
+                    self._condition.wait(None if next_try is None else next_try - now)
+            METRICS.set("outbox_mails", len(self._pending))
+            self._send(due)
+
+    def _send(self, mails: list[dict]) -> None:
+        smtp = None
+        for index, mail in enumerate(mails):
+            if smtp is None:
+                try:
+                    smtp = self._connect()
+                except Exception as err:
+                    # Nothing gets through without a connection
+                    for unsent in mails[index:]:
+                        self._failed(unsent, err)
+                    return
+            try:
+                with METRICS.stage("send_mail"):
+                    self._deliver(smtp, mail)
+            except Exception as err:
+                self._failed(mail, err)
+                # It may have broken off mid mail, the next one starts afresh
+                smtp = self._close(smtp)
+            else:
+                self._remove(mail)
+                with self._condition:
+                    self._pending.pop(mail["id"], None)
+                self.results.put((mail, None, False))
+        self._close(smtp)
+
+    def _failed(self, mail: dict, err: Exception) -> None:
+        print(err)
+        mail["attempts"] += 1
+        retrying = mail["attempts"] < MAX_ATTEMPTS
+        if retrying:
+            delay = min(RETRY_DELAY_S * 2**(mail["attempts"] - 1), MAX_RETRY_DELAY_S)
+            mail["next_try"] = time.time() + delay
+            self._write(mail)
+        else:
+            self._remove(mail)
+            with self._condition:
+                self._pending.pop(mail["id"], None)
+        # Only the first failure and giving up are worth telling
+        if mail["attempts"] == 1 or not retrying:
+            self.results.put((mail, err, retrying))
+
+    def _connect(self):
+        import smtplib
+        config = self.config()
+        if config["SECURITY"] == "ssl":
+            smtp = smtplib.SMTP_SSL(config["MAIL_SERVER"], config["PORT"], timeout=SMTP_TIMEOUT_S)
+        else:
+            smtp = smtplib.SMTP(config["MAIL_SERVER"], config["PORT"], timeout=SMTP_TIMEOUT_S)
+            if config["SECURITY"] == "starttls":
+                smtp.starttls()
+        try:
+            if config.get("PASSWORD"):
+                smtp.login(config["EMAIL"], config["PASSWORD"])
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    @staticmethod
+    def _close(smtp) -> None:
+        if smtp is None:
+            return None
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+        return None
+
+    def _deliver(self, smtp, mail: dict) -> None:
+        # smtplib would build the whole message in memory, the data is
+        # written to the socket as it is encoded instead
+        import smtplib
+        sender = self.config()["EMAIL"]
+        smtp.ehlo_or_helo_if_needed()
+        code, reply = smtp.mail(sender)
+        if code != 250:
+            raise smtplib.SMTPSenderRefused(code, reply, sender)
+        for address in mail["to"]:
+            code, reply = smtp.rcpt(address)
+            if code not in (250, 251):
+                smtp.rset()
+                raise smtplib.SMTPRecipientsRefused({address: (code, reply)})
+        code, reply = smtp.docmd("data")
+        if code != 354:
+            raise smtplib.SMTPDataError(code, reply)
+        for chunk in self._message(sender, mail):
+            smtp.sock.sendall(chunk)
+        smtp.sock.sendall(b".\r\n")
+        code, reply = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+
+    def _message(self, sender: str, mail: dict) -> Iterator[bytes]:
+        # Everything below the headers is base64, no line starts with a dot
+        import email.header
+        import email.utils
+        boundary = f"=={uuid.uuid4().hex}"
+        subject = mail["subject"]
+        if not subject.isascii():
+            subject = email.header.Header(subject, "utf-8").encode()
+        headers = [f"From: {sender}",
+                   f"To: {', '.join(mail['to'])}",
+                   f"Subject: {subject}",
+                   f"Date: {email.utils.formatdate(localtime=True)}",
+                   f"Message-ID: {email.utils.make_msgid()}",
+                   "MIME-Version: 1.0",
+                   f'Content-Type: multipart/mixed; boundary="{boundary}"',
+                   "",
+                   f"--{boundary}",
+                   'Content-Type: text/plain; charset="utf-8"',
+                   "Content-Transfer-Encoding: base64",
+                   ""]
+        yield ("\r\n".join(headers) + "\r\n").encode()
+        yield _base64_lines(mail["body"].encode())
+
+        if mail["attachment"] is not None:
+            subtype = "zip" if mail["parts"] == 1 else "octet-stream"
+            headers = [f"--{boundary}",
+                       f"Content-Type: application/{subtype}",
+                       "Content-Transfer-Encoding: base64",
+                       f"Content-Disposition: attachment; {_param('filename', mail['filename'])}",
+                       ""]
+            yield ("\r\n".join(headers) + "\r\n").encode()
+            with self.root.joinpath(mail["attachment"]).open("rb") as file:
+                while True:
+                    chunk = file.read(CHUNK)
+                    if len(chunk) == 0:
+                        break
+                    yield _base64_lines(chunk)
+        yield f"--{boundary}--\r\n".encode()
+
+    def completed(self) -> Iterator[tuple[dict, Exception | None, bool]]:
+        while True:
+            try:
+                yield self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def stop(self) -> None:
+        # Unsent mails stay in the outbox for the next run
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
@@ -0,0 +1,165 @@
+import bisect
+import contextlib
+import os
+import pathlib
+import threading
+import time
+
+# Where the GUI leaves its metrics, in the Prometheus text format
+METRICS_PATH = pathlib.Path("resources/metrics.prom")
+# The daemon serves them instead, next to the sample server
+METRICS_ADDRESS = ("127.0.0.1", 9_107)
+PREFIX = "chamber_"
+# Upper bounds in seconds, from a sample append to a stuck I2C bus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(labels: tuple[tuple[str, str], ...], **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def rss_bytes() -> int:
+    # Resident set size now, the peak where /proc is missing
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Histogram():
+    "Counts of observations at or below each bucket bound, plus their sum"
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: tuple[tuple[str, str], ...]) -> list[str]:
+        lines = []
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {total}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {total}")
+        return lines
+
+
+class Metrics():
+    """Timings and counters of the hot path, shared by every thread.
+
+    Each stage of a tick, from the sensor read to the archive write, is timed
+    into a histogram. Rendering gives the Prometheus text format, which is
+    what the daemon serves and the GUI writes to METRICS_PATH."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple, Histogram] = {}
+        self._counters: dict[tuple, float] = {}
+        self._gauges: dict[tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        # Unset labels are left out, e.g. the chamber of a single chamber setup
+        return name, tuple(sorted((label, value) for label, value in labels.items()
+                                  if value is not None))
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    @contextlib.contextmanager
+    def stage(self, stage: str):
+        # Times the block, also when it raises
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def render(self) -> str:
+        self.set("rss_bytes", rss_bytes())
+        lines = []
+        with self._lock:
+            for kind, metrics in (("histogram", self._histograms),
+                                  ("counter", self._counters),
+                                  ("gauge", self._gauges)):
+                typed = set()
+                for (name, labels), value in sorted(metrics.items()):
+                    name = PREFIX + name
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    if kind == "histogram":
+                        lines.extend(value.lines(name, labels))
+                    else:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: pathlib.Path = METRICS_PATH) -> None:
+        # Replaced in one go, a scraper never reads half a file
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.render())
+        os.replace(tmp, path)
+
+
+# Everything in the process reports here
+METRICS = Metrics()
+
+
+_profiler = None
+
+
+def toggle_profile(path: pathlib.Path) -> bool:
+    # Profiles the calling thread until toggled again, then writes the stats
+    global _profiler
+    import cProfile
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+        return True
+    _profiler.disable()
+    _profiler.dump_stats(path)
+    _profiler = None
+    return False
+
+
+def toggle_trace(path: pathlib.Path, limit: int = 25) -> bool:
+    # Traces allocations until toggled again, then writes the top lines
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return True
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    with open(path, "w") as file:
+        for stat in snapshot.statistics("lineno")[:limit]:
+            file.write(f"{stat}\n")
+    return False
@@ -0,0 +1,207 @@
+import array
+import bisect
+import collections
+import datetime as dt
+import hashlib
+import io
+import pathlib
+
+import numpy as np
+
+from typing import Iterable, Iterator
+
+from src.session import atomic_write
+
+
+PROFILE_CACHE_SIZE = 8
+# Compiled profiles between runs, the template directories are left alone
+PROFILE_CACHE_PATH = pathlib.Path("resources/profile_cache")
+
+
+class ProfilePoint():
+    # duration of internal time from the beginning of measurement
+    def __init__(self, duration: dt.timedelta, target_temp: float):
+        self.duration = duration
+        self.target_temp = target_temp
+
+    @classmethod
+    def from_str(cls, string: str):
+        duration, target_temp = string.strip().split(",")
+        hours, minutes, _ = map(int, duration.strip().split(":"))
+        duration = dt.timedelta(hours=hours, minutes=minutes)
+        target_temp = float(target_temp)
+        return cls(duration, target_temp)
+
+    @classmethod
+    def from_xl(cls, time: dt.timedelta | dt.time, temp: str):
+        if isinstance(time, dt.time):
+            # Cells formatted as a time of day rather than a duration
+            time = dt.timedelta(hours=time.hour, minutes=time.minute,
+                                seconds=time.second)
+        duration = time
+        target_temp = float(temp)
+        return cls(duration, target_temp)
+
+    def __repr__(self):
+        return f"ProfilePoint(duration={repr(self.duration)}, target_temp={repr(self.target_temp)})"
+
+    def __str__(self):
+        seconds = int(self.duration.total_seconds())
+        quot, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(quot, 60)
+        duration = f"{hours:02}:{minutes:02}:{seconds:02}"
+        return f"{duration},{self.target_temp}"
+
+
+class Profile():
+    """Breakpoints of a temperature profile.
+
+    Between breakpoints the target is interpolated linearly, before the first
+    and after the last one it holds the nearest target."""
+
+    def __init__(self, durations: np.ndarray, target_temps: np.ndarray):
+        if len(durations) == 0:
+            raise ValueError("The profile has no points.")
+        order = np.argsort(durations, kind="stable")
+        self.durations = np.asarray(durations, dtype=np.float64)[order]
+        self.target_temps = np.asarray(target_temps, dtype=np.float64)[order]
+        # Profiles are shared through the cache
+        self.durations.flags.writeable = False
+        self.target_temps.flags.writeable = False
+        # Plain lists are faster than numpy for one bisect per sample
+        self._durations = self.durations.tolist()
+        self._target_temps = self.target_temps.tolist()
+
+    @classmethod
+    def from_points(cls, points: Iterable[ProfilePoint]):
+        # Consumes the points one at a time, only the floats are kept
+        durations = array.array("d")
+        target_temps = array.array("d")
+        for point in points:
+            durations.append(point.duration.total_seconds())
+            target_temps.append(point.target_temp)
+        return cls(np.frombuffer(durations), np.frombuffer(target_temps))
+
+    def __len__(self) -> int:
+        return len(self._durations)
+
+    def __call__(self, elapsed: np.ndarray) -> np.ndarray:
+        return np.interp(elapsed, self.durations, self.target_temps)
+
+    def at(self, elapsed: float) -> float:
+        # Right of equal durations, a step takes its new value at once like np.interp
+        index = bisect.bisect_right(self._durations, elapsed)
+        if index == 0:
+            return self._target_temps[0]
+        if index == len(self._durations):
+            return self._target_temps[-1]
+        start, end = self._durations[index - 1], self._durations[index]
+        start_temp, end_temp = self._target_temps[index - 1], self._target_temps[index]
+        return start_temp + (end_temp - start_temp) * (elapsed - start) / (end - start)
+
+
+def iter_profile(path: pathlib.Path) -> Iterator[ProfilePoint]:
+    file_format = path.suffix
+
+    if file_format == ".csv":
+        with path.open() as file:
+            # Skip header
+            next(file)
+            for line in file:
+                line = line.strip()
+                if len(line) == 0:
+                    break
+                yield ProfilePoint.from_str(line)
+
+    elif file_format == ".xlsx":
+        # openpyxl is slow to import, CSV profiles never need it
+        import openpyxl as xl
+        # Read only mode streams the sheet instead of building the workbook
+        wb = xl.load_workbook(filename=path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            for time, temp in ws.iter_rows(min_row=2, max_col=2, values_only=True):
+                if time is None or temp is None:
+                    break
+                yield ProfilePoint.from_xl(time=time, temp=temp)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Unsupported file format {file_format} for a profile."
+                         f"Supported formats are '.csv' and '.xlsx'.")
+
+
+def parse_profile(path: pathlib.Path) -> list[ProfilePoint]:
+    return list(iter_profile(path))
+
+
+class ProfileCache():
+    """Least recently used compiled profiles.
+
+    Entries are keyed on the path together with its modification time and
+    size, so an edited template is parsed again. Compiled profiles are also
+    kept in a sidecar file in the cache directory to survive restarts."""
+
+    def __init__(self, maxsize: int = PROFILE_CACHE_SIZE, sidecar: bool = True,
+                 directory: pathlib.Path = PROFILE_CACHE_PATH):
+        self.maxsize = maxsize
+        self.sidecar = sidecar
+        self.directory = directory
+        self._profiles: collections.OrderedDict[tuple, Profile] = collections.OrderedDict()
+
+    def sidecar_path(self, key: tuple) -> pathlib.Path:
+        # Templates of the same name in different directories get their own
+        digest = hashlib.sha1(key[0].encode()).hexdigest()[:16]
+        return self.directory.joinpath(f"{pathlib.Path(key[0]).name}.{digest}.npz")
+
+    def load(self, path: pathlib.Path) -> Profile:
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+        profile = self._profiles.get(key)
+        if profile is not None:
+            self._profiles.move_to_end(key)
+            return profile
+
+        profile = self._read_sidecar(key)
+        if profile is None:
+            profile = Profile.from_points(iter_profile(path))
+            self._write_sidecar(key, profile)
+
+        self._profiles[key] = profile
+        while len(self._profiles) > self.maxsize:
+            self._profiles.popitem(last=False)
+        return profile
+
+    def clear(self) -> None:
+        self._profiles.clear()
+
+    def _read_sidecar(self, key: tuple) -> Profile | None:
+        if not self.sidecar:
+            return None
+        try:
+            with np.load(self.sidecar_path(key)) as cached:
+                if tuple(cached["key"].tolist()) != key[1:]:
+                    return None
+                return Profile(cached["durations"], cached["target_temps"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _write_sidecar(self, key: tuple, profile: Profile) -> None:
+        if not self.sidecar:
+            return
+        buffer = io.BytesIO()
+        np.savez(buffer, key=np.array(key[1:], dtype=np.int64),
+                 durations=profile.durations, target_temps=profile.target_temps)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.sidecar_path(key), buffer.getvalue())
+        except OSError:
+            # Without a writable cache the next run parses the template again
+            pass
+
+
+profile_cache = ProfileCache()
+
+
+def load_profile(path: pathlib.Path) -> Profile:
+    return profile_cache.load(path)
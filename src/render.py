@@ -0,0 +1,75 @@
+import io
+
+from src.lod import decimate
+from src.store import SECONDS_PER_DAY, MeasurementStore
+
+
+# Resolution of the day figures by purpose
+RENDER_TIERS = {
+    # Hourly checkpoints of the running day
+    "checkpoint": 100,
+    # The running day when the archive is exported
+    "export": 300,
+    # A closed day, rendered once
+    "final": 1200,
+}
+# Tick spacings of the time axes in seconds, the first one that fits is used
+TIME_STEPS = (60, 300, 600, 900, 1800, 3600, 2*3600, 3*3600, 6*3600, 12*3600, 24*3600)
+
+
+def format_time(seconds: float, pos=None) -> str:
+    # Total hours, a multi day profile goes past 24:00
+    minutes = int(round(seconds)) // 60
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def format_time_axis(ax, start: float, end: float, ticks: int = 12) -> None:
+    # The x axis stays numeric seconds, only the visible ticks become strings
+    import matplotlib.ticker as ticker
+    step = next((step for step in TIME_STEPS if (end - start) / step <= ticks),
+                TIME_STEPS[-1])
+    ax.xaxis.set_major_locator(ticker.MultipleLocator(step))
+    ax.xaxis.set_major_formatter(ticker.FuncFormatter(format_time))
+
+
+def render_day(data: MeasurementStore, title: str, dpi: int) -> io.BytesIO:
+    # Uses its own Agg figure, not pyplot, so it is safe off the main thread.
+    # matplotlib is imported here, on the saver thread, not at startup
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    # Assumes data is just one day
+
+    # No more than the extremes of each pixel column are drawn
+    keep = decimate(data.elapsed, data.real_temps, data.target_temps, data.humidities,
+                    buckets=int(fig.get_figwidth()*dpi))
+    times = data.elapsed[keep] % SECONDS_PER_DAY
+    ax.plot(times, data.real_temps[keep],
+            label="Actual", color="blue")
+    ax.plot(times, data.target_temps[keep],
+            label="Target", color="red")
+    ax_humidity = ax.twinx()
+    ax_humidity.plot(times, data.humidities[keep],
+                     label="Humidity", color="green")
+    ax_humidity.set_ylabel("Relative humidity (%)")
+    ax_humidity.set_ylim([0, 100])
+    # Format plot
+    if len(times) > 1:
+        ax.set_xlim(times[0], times[-1])
+        format_time_axis(ax, times[0], times[-1], ticks=10)
+    ax.tick_params(axis="x", labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    fig.subplots_adjust(bottom=0.30)
+    ax.set_title(title)
+    ax.set_xlabel("Time (hh:mm)")
+    ax.set_ylabel("Temperature (°C)")
+    ax.legend(handles=[*ax.get_lines(), *ax_humidity.get_lines()])
+
+    fig_buf = io.BytesIO()
+    fig.savefig(fig_buf, format='png', dpi=dpi)
+    fig_buf.seek(0)
+    return fig_buf
@@ -0,0 +1,164 @@
+import datetime as dt
+import io
+import pathlib
+import tempfile
+import time
+import zipfile
+from typing import Callable, Iterator
+
+import numpy as np
+
+from src.acquisition import Reading
+from src.controller import Controller
+from src.exports import EXPORT_FORMATS, available_formats, read_arrow, read_npz
+from src.runner import Runner
+from src.store import MeasurementStore
+
+# Members tried in order, the columnar ones need no parsing
+LOAD_ORDER = ("npz", "parquet", "feather", "csv")
+
+
+def load_archive(path: pathlib.Path) -> tuple[MeasurementStore, str | None]:
+    "The samples and the name of the profile of an archive, read in place"
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        profile = next((name for name in names if name.endswith((".csv", ".xlsx"))
+                        and "/" not in name and not name.startswith("measurement.")), None)
+        for fmt in LOAD_ORDER:
+            member = EXPORT_FORMATS[fmt][0]
+            if member not in names or fmt not in available_formats():
+                continue
+            if fmt == "csv":
+                # Streamed out of the archive, it is never extracted
+                with archive.open(member) as file:
+                    with io.TextIOWrapper(file, encoding="utf-8") as text:
+                        text.readline()
+                        return MeasurementStore.read_csv(text), profile
+            # np.load and pyarrow want to seek, the member is read into memory
+            buffer = io.BytesIO(archive.read(member))
+            if fmt == "npz":
+                return read_npz(buffer), profile
+            return read_arrow(buffer, fmt), profile
+    raise ValueError(f"{path.name} holds no measurement.")
+
+
+class ReplayChannel():
+    """Readings of an archived run, released at speed times the recorded pace.
+
+    Stands in for a sensor channel, drain() returns whatever is due by now.
+    An infinite speed releases everything at once."""
+
+    def __init__(self, data: MeasurementStore, start_t: dt.datetime, speed: float = 60.0):
+        self.data = data
+        self.start_t = start_t
+        self.speed = speed
+        # Nothing is ever dropped, the archive is read as fast as it is drained
+        self.dropped = 0
+        self.error: Exception = None
+        self._next = 0
+        self._origin: float = None
+        self._paused_at: float = None
+
+    @property
+    def running(self) -> bool:
+        return self._paused_at is None
+
+    @property
+    def finished(self) -> bool:
+        return self._next >= len(self.data)
+
+    def drain(self) -> Iterator[Reading]:
+        if not self.running or self.finished:
+            return
+        now = time.monotonic()
+        if self._origin is None:
+            self._origin = now
+        elapsed = self.data.elapsed
+        if np.isinf(self.speed):
+            end = len(elapsed)
+        else:
+            until = elapsed[0] + (now - self._origin)*self.speed
+            end = int(np.searchsorted(elapsed, until, side="right"))
+
+        start, self._next = self._next, end
+        real_temps = self.data.real_temps
+        humidities = self.data.humidities
+        for index in range(start, end):
+            humidity = float(humidities[index])
+            yield Reading(time=self.start_t + dt.timedelta(seconds=float(elapsed[index])),
+                          real_temp=float(real_temps[index]),
+                          humidity=None if humidity != humidity else humidity)
+
+    def pause(self) -> None:
+        if self.running:
+            self._paused_at = time.monotonic()
+
+    def resume(self) -> None:
+        if not self.running:
+            if self._origin is not None:
+                self._origin += time.monotonic() - self._paused_at
+            self._paused_at = None
+
+
+class ReplayRunner(Runner):
+    """Runs a controller on an archived run instead of a sensor.
+
+    Everything downstream of the samples, events, plots and saves, behaves
+    as it did live, so it also serves as a deterministic load generator."""
+
+    def __init__(self, controller: Controller, path: pathlib.Path, speed: float = 60.0):
+        data, profile = load_archive(path)
+        # Working files of the replay, never an archive of the user's
+        self.directory = tempfile.TemporaryDirectory()
+        if profile is not None and controller.profile_path is None:
+            # Targets come from the archived profile, as they did live
+            with zipfile.ZipFile(path) as archive:
+                controller.profile_path = pathlib.Path(
+                    archive.extract(profile, self.directory.name))
+            controller.recalculate()
+        # Pauses are already in the data, the replay keeps its own clock
+        controller.start_t = dt.datetime.now().replace(microsecond=0)
+        # Kept apart from live sessions, a replay is never recovered
+        controller.chamber = "replay"
+        controller.sessions = pathlib.Path(self.directory.name, "sessions")
+        super().__init__(controller, None, 0.0,
+                         channel=ReplayChannel(data, controller.start_t, speed))
+
+    @property
+    def finished(self) -> bool:
+        return self.channel.finished
+
+    def pause(self) -> None:
+        # Only the replay stops, the controller keeps no pause of its own
+        self.channel.pause()
+        self.publish({"type": "paused"})
+
+    def resume(self) -> None:
+        self.channel.resume()
+        self.publish({"type": "resumed"})
+
+    def close(self, discard: bool = True) -> None:
+        super().close(discard=discard)
+        self.directory.cleanup()
+
+
+def replay(path: pathlib.Path, consumer: Callable[[dict], None] = None,
+           speed: float = float("inf"), interval: float = 1.0) -> Controller:
+    "Replays an archive headless, handing every event to consumer"
+    controller = Controller(name=path.stem)
+    runner = ReplayRunner(controller, path, speed)
+    subscription = runner.subscribe()
+    runner.start(pathlib.Path(runner.directory.name, path.name))
+    try:
+        while True:
+            runner.step()
+            for event in subscription.drain():
+                if consumer is not None:
+                    consumer(event)
+            if runner.finished:
+                break
+            time.sleep(interval)
+        controller.saver.wait()
+    finally:
+        runner.close(discard=True)
+    return controller
@@ -0,0 +1,283 @@
+import concurrent.futures
+import pathlib
+import queue
+import threading
+from functools import partial
+
+from src.acquisition import Acquisition, Channel
+from src.controller import Controller
+from src.mail import OUTBOX_PATH, Mailer
+from src.metrics import METRICS, toggle_profile, toggle_trace
+
+
+class Subscription():
+    # Events of one subscriber, closed when it falls too far behind
+    def __init__(self, maxsize: int = 0):
+        self.events: queue.Queue[dict] = queue.Queue(maxsize)
+        self.closed = False
+
+    def put(self, event: dict) -> bool:
+        try:
+            self.events.put_nowait(event)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+    def get(self, timeout: float = None) -> dict | None:
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        while True:
+            try:
+                yield self.events.get_nowait()
+            except queue.Empty:
+                return
+
+
+class Runner():
+    """Drives one chamber: acquisition, profile evaluation and persistence.
+
+    The controller is only ever touched by the thread calling step(), other
+    threads go through call(). Everything that happens is published to the
+    subscribers as plain dict events, the GUI is just one of them."""
+
+    def __init__(self, controller: Controller, sensor, interval: float,
+                 acquisition: Acquisition = None, periodic: bool = False,
+                 channel: Channel = None):
+        self.controller = controller
+        # A given channel is fed by someone else, e.g. a replayed archive
+        self._owns_acquisition = acquisition is None and channel is None
+        if channel is None:
+            channel = Channel(sensor)
+        self.channel = channel
+        # Without a shared acquisition the runner samples on its own
+        if self._owns_acquisition:
+            acquisition = Acquisition(interval, periodic=periodic, clock=controller.clock)
+        self.acquisition = acquisition
+        if acquisition is not None:
+            acquisition.add(self.channel)
+        self._subscriptions: list[Subscription] = []
+        self._lock = threading.Lock()
+        self._calls: queue.Queue = queue.Queue()
+        self._thread: int = None
+        self._stopped = threading.Event()
+        # Each chamber has its own outbox
+        self.mailer = Mailer(OUTBOX_PATH.joinpath(controller.chamber or "default"))
+
+    def start(self, measurement_path: pathlib.Path) -> None:
+        # Whoever starts the runner is expected to keep calling step()
+        self._thread = threading.get_ident()
+        controller = self.controller
+        # A recovered controller carries on with its own start and archive
+        if controller.start_t is None:
+            controller.start_t = controller.clock.now()
+        if controller.temp_save or controller.measurement_path is None:
+            controller.measurement_path = measurement_path
+        if controller.paused:
+            self.channel.pause()
+        if self._owns_acquisition:
+            self.acquisition.start()
+        self.mailer.resume()
+        self.controller.save_session()
+
+    def step(self) -> None:
+        self._thread = threading.get_ident()
+        # Requests from other threads run here, between samples
+        while True:
+            try:
+                func, args, future = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                future.set_result(func(*args))
+            except Exception as err:
+                future.set_exception(err)
+
+        controller = self.controller
+        err = self.channel.error
+        if err is not None:
+            # Paused before the error is cleared, so it is only reported once
+            self.pause()
+            self.channel.error = None
+            self.publish({"type": "error",
+                          "message": f"Reading the sensor failed, the measurement is paused. {err}"})
+        for reading in self.channel.drain():
+            with METRICS.stage("add_data_point"):
+                result = controller.add_data_point(
+                    reading.real_temp, reading.time, reading.humidity)
+            METRICS.inc("samples_total", chamber=controller.chamber)
+            if result != "ok":
+                self.publish({"type": result, "day": controller.day,
+                              "hour": controller.hour})
+                controller.save_session()
+            self.publish(self.sample(len(controller.data) - 1))
+        with METRICS.stage("journal_sync"):
+            controller.sync_journal()
+        METRICS.set("dropped_readings", self.channel.dropped, chamber=controller.chamber)
+
+        for callback, err in controller.saver.completed():
+            if callback is not None:
+                callback(err)
+            elif err is not None:
+                self.publish({"type": "error",
+                              "message": f"Saving the measurement failed. {err}"})
+
+        for mail, err, retrying in self.mailer.completed():
+            if err is None:
+                # A split archive counts as sent with its last part
+                if mail["part"] == mail["parts"]:
+                    self.publish({"type": "mail", "ok": True})
+            elif retrying:
+                self.publish({"type": "error",
+                              "message": f"Sending the mail to {', '.join(mail['to'])} failed, "
+                                         f"it stays in the outbox and is retried. {err}"})
+            else:
+                self.publish({"type": "mail", "ok": False})
+
+    def run_forever(self, interval: float = 1.0) -> None:
+        while not self._stopped.wait(interval):
+            self.step()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def close(self, discard: bool) -> None:
+        if self._owns_acquisition:
+            self.acquisition.stop()
+        elif self.acquisition is not None:
+            self.acquisition.remove(self.channel)
+        self.controller.close_session(discard=discard)
+        self.controller.saver.stop()
+        self.mailer.stop()
+
+    def call(self, func, *args, timeout: float = None):
+        # Runs func on the runner thread and waits for its result
+        if self._thread is None or self._thread == threading.get_ident():
+            return func(*args)
+        future = concurrent.futures.Future()
+        self._calls.put((func, args, future))
+        return future.result(timeout)
+
+    def sample(self, index: int) -> dict:
+        data = self.controller.data
+        return {"type": "sample",
+                "day": self.controller.day,
+                "elapsed": float(data.elapsed[index]),
+                "real_temp": float(data.real_temps[index]),
+                "target_temp": float(data.target_temps[index]),
+                "humidity": float(data.humidities[index])}
+
+    def subscribe(self, backlog: bool = False, maxsize: int = 0) -> Subscription:
+        if backlog and maxsize > 0:
+            # Room for the day so far on top, however fast the sampling
+            maxsize += len(self.controller.data) + 1
+        subscription = Subscription(maxsize)
+        if backlog:
+            # Late subscribers first catch up on the current state and day
+            subscription.put(self.status())
+            for index in range(len(self.controller.data)):
+                subscription.put(self.sample(index))
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, event: dict) -> None:
+        with self._lock:
+            for subscription in list(self._subscriptions):
+                if not subscription.put(event):
+                    self._subscriptions.remove(subscription)
+
+    def status(self) -> dict:
+        controller = self.controller
+        profile_path = controller.profile_path
+        return {"type": "status",
+                "name": controller.name,
+                "day": controller.day,
+                "hour": controller.hour,
+                "paused": controller.paused,
+                "temp_save": controller.temp_save,
+                "profile": None if profile_path is None else str(profile_path)}
+
+    def pause(self) -> None:
+        self.channel.pause()
+        self.controller.pause()
+        self.publish({"type": "paused"})
+
+    def resume(self) -> None:
+        self.controller.resume()
+        self.channel.resume()
+        self.publish({"type": "resumed"})
+
+    def load_profile(self, path: pathlib.Path) -> None:
+        controller = self.controller
+        previous = controller.profile_path
+        controller.profile_path = path
+        try:
+            target_temps = controller.recalculate()
+        except Exception:
+            controller.profile_path = previous
+            raise
+        self.publish({"type": "targets",
+                      "profile": str(path),
+                      "target_temps": target_temps.tolist()})
+        controller.save_session()
+
+    def profile(self, path: pathlib.Path) -> bool:
+        # Profiles the runner thread, the stats are written when toggled off
+        return toggle_profile(path)
+
+    def trace(self, path: pathlib.Path) -> bool:
+        return toggle_trace(path)
+
+    def save(self) -> None:
+        self.controller.export_session(on_done=self._on_saved)
+
+    def save_as(self, path: pathlib.Path) -> None:
+        self.controller.save_as_session(path, on_done=self._on_saved)
+
+    def email(self, address: str) -> None:
+        # The mail is queued once the archive is written
+        self.controller.export_session(
+            on_done=partial(self._queue_mail, address))
+
+    def _on_saved(self, err) -> None:
+        if err is None:
+            self.publish({"type": "saved"})
+        else:
+            self.publish({"type": "error",
+                          "message": f"Saving the measurement failed. {err}"})
+
+    def _queue_mail(self, address: str, err) -> None:
+        if err is not None:
+            self._on_saved(err)
+            return
+        controller = self.controller
+        now = controller.clock.now()
+        if controller.temp_save:
+            filename = "attachment.zip"
+        else:
+            filename = controller.measurement_path.name
+        # Copied into the outbox on the saver thread, before another export
+        # can replace the archive, then sent in the background
+        controller.saver.submit(
+            f"mail {now.isoformat()} {address}",
+            partial(self.mailer.submit,
+                    [part.strip() for part in address.split(",") if part.strip() != ""],
+                    "ENV chamber " + now.strftime("%d/%m/%Y, %H:%M"),
+                    "Environmental chamber measurement from " + now.strftime("%d/%m/%Y, %H:%M"),
+                    controller.measurement_path, filename),
+            self._on_queued)
+
+    def _on_queued(self, err) -> None:
+        if err is not None:
+            self.publish({"type": "error",
+                          "message": f"Queueing the mail failed. {err}"})
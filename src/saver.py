@@ -0,0 +1,85 @@
+import collections
+import queue
+import threading
+from typing import Callable, Iterator
+
+Callback = Callable[[Exception | None], None]
+
+
+class Saver(threading.Thread):
+    """Runs save jobs one at a time, away from the Tk main loop.
+
+    Jobs are keyed, submitting a job whose key is still pending replaces it
+    so a backlog of saves collapses into the newest one. Callbacks are not
+    called from the worker, they are queued in results for the GUI to run."""
+
+    def __init__(self):
+        super().__init__(name="saver", daemon=True)
+        self._pending: collections.OrderedDict[str, tuple[Callable[[], None], list[Callback]]] = \
+            collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._stopped = False
+        self.results: queue.Queue[tuple[Callback | None, Exception | None]] = queue.Queue()
+
+    def submit(self, key: str, job: Callable[[], None], on_done: Callback = None,
+               supersedes: tuple[str, ...] = ()) -> None:
+        with self._condition:
+            callbacks = []
+            for pending in (key, *supersedes):
+                if pending in self._pending:
+                    callbacks.extend(self._pending.pop(pending)[1])
+            if on_done is not None:
+                callbacks.append(on_done)
+            self._pending[key] = (job, callbacks)
+            self._condition.notify_all()
+
+        if self.ident is None:
+            self.start()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._pending) > 0 or self._stopped)
+                if len(self._pending) == 0:
+                    return
+                _, (job, callbacks) = self._pending.popitem(last=False)
+                self._busy = True
+
+            error = None
+            try:
+                job()
+            except Exception as err:
+                error = err
+
+            if len(callbacks) == 0 and error is not None:
+                self.results.put((None, error))
+            for callback in callbacks:
+                self.results.put((callback, error))
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def completed(self) -> Iterator[tuple[Callback | None, Exception | None]]:
+        while True:
+            try:
+                yield self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def wait(self) -> None:
+        # Blocks until every submitted job has run
+        if self.ident is None:
+            return
+        with self._condition:
+            self._condition.wait_for(
+                lambda: len(self._pending) == 0 and not self._busy)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self.ident is not None:
+            self.join()
@@ -1,26 +1,267 @@
 #!/usr/bin/env python3
 
 # Imports from standard libraries
-import time
+import asyncio
+import math
+import random
+from typing import Callable, NamedTuple
 
-# Function definitions()
+from src.clock import Clock
 
-
-def get_measurement():
-    import smbus
-    # Get I2C bus
-    bus = smbus.SMBus(1)
-    bus.write_i2c_block_data(0x45, 0x2C, [0x06])
-    time.sleep(0.5)
 # SHT31 address, 0x45(68)
-# Read data back from 0x00(00), 6 bytes
-# Temp MSB, Temp LSB, Temp CRC, Humididty MSB, Humidity LSB, Humidity CRC
-    data = bus.read_i2c_block_data(0x45, 0x00, 6)
+SHT31_ADDRESS = 0x45
+SHT31_BUS = 1
+# Time the sensor needs to finish a high repeatability single shot measurement
+CONVERSION_TIME = 0.5
+# Periodic mode commands by measurements per second, high repeatability
+PERIODIC_COMMANDS = {
+    0.5: (0x20, 0x32),
+    1: (0x21, 0x30),
+    2: (0x22, 0x36),
+    4: (0x23, 0x34),
+    10: (0x27, 0x37),
+}
+FETCH_COMMAND = (0xE0, 0x00)
+BREAK_COMMAND = (0x30, 0x93)
+# Reads with a bad checksum are repeated this many times
+RETRIES = 2
+
+
+def _crc_table(polynomial: int) -> bytes:
+    table = bytearray(256)
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc << 1) ^ polynomial if crc & 0x80 else crc << 1
+        table[byte] = crc & 0xFF
+    return bytes(table)
+
+
+# CRC-8 of the SHT3x datasheet: x^8 + x^5 + x^4 + 1, initialised to 0xFF
+CRC_TABLE = _crc_table(0x31)
+
+
+def crc8(data: bytes) -> int:
+    crc = 0xFF
+    for byte in data:
+        crc = CRC_TABLE[crc ^ byte]
+    return crc
+
+
+class CRCError(OSError):
+    "A word of the sensor's reply did not match its checksum"
+
+
+class Sample(NamedTuple):
+    temperature: float
+    humidity: float
+
+
+def decode(data: list[int]) -> Sample:
+    # Temp MSB, Temp LSB, Temp CRC, Humidity MSB, Humidity LSB, Humidity CRC
+    for word in (data[0:3], data[3:6]):
+        if crc8(word[:2]) != word[2]:
+            raise CRCError(f"SHT31 checksum mismatch in {bytes(data).hex()}")
     temp = data[0] * 256 + data[1]
-    cTemp = -45 + (175 * temp / 65535.0)
-    return round(cTemp, 2)
+    humidity = data[3] * 256 + data[4]
+    return Sample(temperature=round(-45 + (175 * temp / 65535.0), 2),
+                  humidity=round(100 * humidity / 65535.0, 2))
+
+
+def periodic_rate(interval: float) -> float:
+    # The slowest free running rate that still has a fresh value every interval
+    return min((rate for rate in PERIODIC_COMMANDS if rate*interval >= 1),
+               default=max(PERIODIC_COMMANDS))
+
+
+class SHT31():
+    # Keeps one bus handle open for the lifetime of the sensor
+    conversion_time = CONVERSION_TIME
+
+    def __init__(self, bus: int = SHT31_BUS, address: int = SHT31_ADDRESS):
+        self.bus_number = bus
+        self.address = address
+        self.periodic = False
+        self._bus = None
+
+    @property
+    def bus(self):
+        if self._bus is None:
+            import smbus
+            self._bus = smbus.SMBus(self.bus_number)
+        return self._bus
+
+    def trigger(self) -> None:
+        # Single shot, high repeatability, clock stretching enabled
+        self.bus.write_i2c_block_data(self.address, 0x2C, [0x06])
+
+    def fetch(self) -> Sample:
+        # Read data back from 0x00(00), 6 bytes
+        data = self.bus.read_i2c_block_data(self.address, 0x00, 6)
+        return decode(data)
+
+    def start_periodic(self, rate: float = 1) -> None:
+        # The sensor free runs, single shot commands are refused until stopped
+        msb, lsb = PERIODIC_COMMANDS[rate]
+        self.bus.write_i2c_block_data(self.address, msb, [lsb])
+        self.periodic = True
+
+    def fetch_periodic(self) -> Sample:
+        # The latest measurement, the sensor NACKs if there is none yet
+        msb, lsb = FETCH_COMMAND
+        self.bus.write_i2c_block_data(self.address, msb, [lsb])
+        return self.fetch()
+
+    def stop_periodic(self) -> None:
+        msb, lsb = BREAK_COMMAND
+        self.bus.write_i2c_block_data(self.address, msb, [lsb])
+        self.periodic = False
+
+    def close(self) -> None:
+        if self._bus is not None:
+            if self.periodic:
+                try:
+                    self.stop_periodic()
+                except OSError as err:
+                    print(err)
+            self._bus.close()
+            self._bus = None
+
+
+class RandomSensor():
+    # Stand-in for the SHT31 when running without the hardware
+    conversion_time = 0.0
+
+    def __init__(self, bus: int = SHT31_BUS, address: int = SHT31_ADDRESS):
+        self.bus_number = bus
+        self.address = address
+
+    def trigger(self) -> None:
+        pass
+
+    def fetch(self) -> Sample:
+        return Sample(temperature=random.randint(0, 100),
+                      humidity=random.randint(0, 100))
+
+    def read(self) -> Sample:
+        return self.fetch()
+
+    def start_periodic(self, rate: float = 1) -> None:
+        pass
+
+    def fetch_periodic(self) -> Sample:
+        return self.fetch()
+
+    def stop_periodic(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedSensor():
+    """A chamber whose air follows its target as a first order lag.
+
+    The temperature approaches the target with time constant tau, humidity
+    follows from a fixed dew point. Time comes from the clock, so with a
+    simulated one a month long run takes minutes."""
+    conversion_time = 0.0
+
+    def __init__(self, bus: int = SHT31_BUS, address: int = SHT31_ADDRESS,
+                 target: Callable = None, clock: Clock = None, tau: float = 900.0,
+                 ambient: float = 22.0, dew_point: float = 8.0, noise: float = 0.05,
+                 seed: int = None):
+        self.bus_number = bus
+        self.address = address
+        # Target temperature at a datetime, None without a profile
+        self.target = target
+        self.clock = Clock() if clock is None else clock
+        self.tau = tau
+        self.ambient = ambient
+        self.dew_point = dew_point
+        self.noise = noise
+        self.temperature = ambient
+        self._last = None
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def _vapour_pressure(temp: float) -> float:
+        # Magnus formula, hPa
+        return 6.112 * math.exp(17.62 * temp / (243.12 + temp))
+
+    def trigger(self) -> None:
+        pass
+
+    def fetch(self) -> Sample:
+        now = self.clock.now()
+        if self._last is not None:
+            target = None if self.target is None else self.target(now)
+            if target is None or target != target:
+                target = self.ambient
+            step = (now - self._last).total_seconds()
+            self.temperature += (target - self.temperature) * (1 - math.exp(-step / self.tau))
+        self._last = now
+
+        temp = self.temperature + self._random.gauss(0, self.noise)
+        humidity = 100 * self._vapour_pressure(self.dew_point) / self._vapour_pressure(temp)
+        return Sample(temperature=round(temp, 2),
+                      humidity=round(min(max(humidity, 0.0), 100.0), 2))
+
+    def read(self) -> Sample:
+        return self.fetch()
+
+    def start_periodic(self, rate: float = 1) -> None:
+        pass
+
+    def fetch_periodic(self) -> Sample:
+        return self.fetch()
+
+    def stop_periodic(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncSensor():
+    """Awaitable reads of a sensor for an asyncio event loop.
+
+    The conversion wait yields to the loop, so the reads of many sensors
+    overlap. In periodic mode the sensor free runs and a read is just a
+    fetch, there is no wait at all."""
+
+    def __init__(self, sensor, periodic: float = None):
+        self.sensor = sensor
+        # Measurements per second in periodic mode, None for single shots
+        self.periodic = periodic
+        self._started = False
+
+    async def start(self) -> None:
+        if self.periodic is not None and not self._started:
+            self.sensor.start_periodic(self.periodic)
+            # The first measurement is ready one period later
+            await asyncio.sleep(1/self.periodic)
+        self._started = True
+
+    async def read(self) -> Sample:
+        if not self._started:
+            await self.start()
+        # Only this sensor's read is repeated, the others are not held up
+        for attempt in range(RETRIES + 1):
+            try:
+                return await self._read()
+            except CRCError as err:
+                if attempt == RETRIES:
+                    raise
+                print(err)
+
+    async def _read(self) -> Sample:
+        if self.periodic is not None:
+            return self.sensor.fetch_periodic()
+        self.sensor.trigger()
+        await asyncio.sleep(self.sensor.conversion_time)
+        return self.sensor.fetch()
 
+    def close(self) -> None:
+        self.sensor.close()
 
-def get_measurement_test():
-    import random
-    return random.randint(0, 100)
@@ -0,0 +1,221 @@
+import datetime as dt
+import io
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+from src.exports import DEFAULT_FORMATS, EXPORT_FORMATS, check_formats
+from src.store import RECORD_DTYPE, MeasurementStore
+
+
+SESSIONS_PATH = pathlib.Path("resources/sessions")
+MANIFEST = "manifest.json"
+SESSION_VERSION = 4
+
+
+def _fsync_dir(path: pathlib.Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: pathlib.Path, data: bytes) -> None:
+    # Readers see either the old or the new file, never a partial one
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, path)
+    except BaseException:
+        pathlib.Path(temp).unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+class Session():
+    """Working copy of a measurement on disk.
+
+    Samples are appended as fixed width binary records to one chunk per day
+    and figures are replaced one at a time, the manifest is the commit point
+    of every save. CSV is only produced when exporting."""
+
+    def __init__(self, root: pathlib.Path, manifest: dict):
+        self.root = root
+        self.manifest = manifest
+
+    @classmethod
+    def create(cls, start_t: dt.datetime, sessions: pathlib.Path = SESSIONS_PATH,
+               chamber: str = None):
+        name = start_t.strftime("%Y-%m-%d_%H-%M-%S")
+        if chamber is not None:
+            # Chambers started together must not share a directory
+            name = f"{name}_{chamber}"
+        root = sessions.joinpath(name)
+        root.joinpath("data").mkdir(parents=True, exist_ok=True)
+        root.joinpath("figures").mkdir(exist_ok=True)
+        manifest = {
+            "version": SESSION_VERSION,
+            "start_t": start_t.isoformat(),
+            "chamber": chamber,
+            "closed": False,
+            "profile": None,
+            "days": {},
+            "figures": {},
+        }
+        session = cls(root, manifest)
+        session.commit()
+        return session
+
+    @classmethod
+    def open(cls, root: pathlib.Path):
+        with root.joinpath(MANIFEST).open() as file:
+            manifest = json.load(file)
+        if manifest["version"] != SESSION_VERSION:
+            raise ValueError(f"Unsupported session version {manifest['version']}.")
+        session = cls(root, manifest)
+        # Drop whatever was appended after the last commit, including the
+        # chunks of days the manifest does not know yet
+        for path in root.joinpath("data").glob("day*.bin"):
+            chunk = manifest["days"].get(str(int(path.stem[3:])))
+            if chunk is None:
+                path.unlink()
+            elif path.stat().st_size > chunk["size"]:
+                with path.open("r+b") as file:
+                    file.truncate(chunk["size"])
+        return session
+
+    @classmethod
+    def unfinished(cls, chamber: str = None, sessions: pathlib.Path = SESSIONS_PATH):
+        # The newest session of the chamber that was never closed, if any
+        latest = None
+        if not sessions.exists():
+            return None
+        for root in sessions.iterdir():
+            try:
+                with root.joinpath(MANIFEST).open() as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if manifest["version"] != SESSION_VERSION or manifest["closed"]:
+                continue
+            if manifest.get("chamber") != chamber:
+                continue
+            if latest is None or manifest["start_t"] > latest[0]:
+                latest = (manifest["start_t"], root)
+        return None if latest is None else cls.open(latest[1])
+
+    @property
+    def days(self) -> list[int]:
+        return sorted(map(int, self.manifest["days"]))
+
+    def rows(self, day: int) -> int:
+        chunk = self.manifest["days"].get(str(day))
+        return 0 if chunk is None else chunk["rows"]
+
+    def chunk_path(self, day: int) -> pathlib.Path:
+        return self.root.joinpath("data", f"day{day:03}.bin")
+
+    def figure_path(self, day: int) -> pathlib.Path:
+        return self.root.joinpath("figures", f"day{day}.png")
+
+    def append(self, day: int, data: MeasurementStore) -> None:
+        path = self.chunk_path(day)
+        chunk = self.manifest["days"].setdefault(
+            str(day), {"rows": 0, "size": 0})
+        with path.open("ab") as file:
+            # Bytes past the known rows never made it into a commit
+            file.truncate(chunk["size"])
+            data.to_records().tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        chunk["rows"] += len(data)
+        chunk["size"] = chunk["rows"] * RECORD_DTYPE.itemsize
+
+    def rewrite(self, day: int, data: MeasurementStore) -> None:
+        atomic_write(self.chunk_path(day), data.to_records().tobytes())
+        self.manifest["days"][str(day)] = {
+            "rows": len(data), "size": len(data) * RECORD_DTYPE.itemsize}
+        # The figure is kept for the archive but has to be rendered again
+        figure = self.manifest["figures"].get(str(day))
+        if figure is not None:
+            figure["rows"] = None
+
+    def read(self, day: int) -> MeasurementStore:
+        # Copy on write, changes to the returned data never reach the file
+        chunk = self.manifest["days"].get(str(day))
+        if chunk is None or chunk["rows"] == 0:
+            return MeasurementStore(capacity=0)
+        records = np.memmap(self.chunk_path(day), dtype=RECORD_DTYPE,
+                            mode="c", shape=(chunk["rows"],))
+        return MeasurementStore.from_records(records)
+
+    def write_figure(self, day: int, fig_buf: io.BytesIO, title: str = None,
+                     rows: int = None, dpi: int = None) -> None:
+        fig_buf.seek(0)
+        path = self.figure_path(day)
+        atomic_write(path, fig_buf.read())
+        self.manifest["figures"][str(day)] = {
+            "path": path.relative_to(self.root).as_posix(),
+            "title": title,
+            "rows": rows,
+            "dpi": dpi,
+        }
+
+    def figure_is_current(self, day: int, title: str, rows: int, dpi: int) -> bool:
+        # The figure on disk already shows this data at least this sharp
+        figure = self.manifest["figures"].get(str(day))
+        if figure is None or figure["rows"] is None:
+            return False
+        return figure["title"] == title and figure["rows"] == rows and figure["dpi"] >= dpi
+
+    def write_profile(self, profile_path: pathlib.Path) -> None:
+        path = self.root.joinpath(profile_path.name)
+        atomic_write(path, profile_path.read_bytes())
+        self.manifest["profile"] = profile_path.name
+
+    def commit(self) -> None:
+        data = json.dumps(self.manifest, indent=2).encode()
+        atomic_write(self.root.joinpath(MANIFEST), data)
+
+    def close(self) -> None:
+        self.manifest["closed"] = True
+        self.commit()
+
+    def discard(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def export(self, dst: pathlib.Path, formats: tuple[str, ...] = DEFAULT_FORMATS) -> None:
+        # Built next to the destination and renamed over it once complete
+        check_formats(formats)
+        fd, temp = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.")
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(temp, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                # The data in every format asked for, read from the chunks each time
+                for fmt in formats:
+                    name, write, _ = EXPORT_FORMATS[fmt]
+                    with archive.open(name, 'w', force_zip64=True) as member:
+                        write(member, (self.read(day) for day in self.days))
+
+                # PNGs are already compressed
+                for day in sorted(map(int, self.manifest["figures"])):
+                    figure = self.manifest["figures"][str(day)]["path"]
+                    archive.write(self.root.joinpath(figure), figure,
+                                  compress_type=zipfile.ZIP_STORED)
+
+                profile = self.manifest["profile"]
+                if profile is not None:
+                    archive.write(self.root.joinpath(profile), profile)
+            os.replace(temp, dst)
+        except BaseException:
+            pathlib.Path(temp).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,189 @@
+import datetime as dt
+from typing import Iterator, TextIO
+
+import numpy as np
+
+
+CSV_HEADER = "duration,measurement,set_temp,humidity\n"
+SECONDS_PER_DAY = 24*60*60
+# Fixed width row of the binary sample log
+RECORD_DTYPE = np.dtype([("elapsed", "<f8"),
+                         ("real_temp", "<f8"),
+                         ("target_temp", "<f8"),
+                         ("humidity", "<f8")])
+
+
+def format_durations(seconds: np.ndarray) -> list[str]:
+    quot, seconds = np.divmod(seconds.astype(np.int64), 60)
+    hours, minutes = np.divmod(quot, 60)
+    return [f"{h:02}:{m:02}:{s:02}" for h, m, s in
+            zip(hours.tolist(), minutes.tolist(), seconds.tolist())]
+
+
+def parse_duration(duration: str) -> float:
+    hours, minutes, seconds = map(int, duration.strip().split(":"))
+    return float(hours*3600 + minutes*60 + seconds)
+
+
+class DataPoint():
+    # duration of internal time from the beginning of measurement
+    __slots__ = ("duration", "real_temp", "target_temp", "humidity")
+
+    def __init__(self, duration: dt.timedelta, real_temp: float, target_temp: float,
+                 humidity: float = None):
+        self.duration = duration
+        self.real_temp = real_temp
+        self.target_temp = target_temp
+        self.humidity = humidity
+
+    def __repr__(self):
+        return f"DataPoint(duration={repr(self.duration)}, real_temp={repr(self.real_temp)}, target_temp={repr(self.target_temp)}, humidity={repr(self.humidity)})"
+
+
+class MeasurementStore():
+    "Growable columns of elapsed seconds, real and target temperature and humidity"
+
+    def __init__(self, capacity: int = SECONDS_PER_DAY // 10):
+        self._elapsed = np.empty(capacity, dtype=np.float64)
+        self._real = np.empty(capacity, dtype=np.float64)
+        self._target = np.empty(capacity, dtype=np.float64)
+        self._humidity = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+
+    @classmethod
+    def from_columns(cls, elapsed: np.ndarray, real: np.ndarray, target: np.ndarray,
+                     humidity: np.ndarray = None):
+        # Wraps existing columns without copying them
+        store = cls(capacity=0)
+        store._elapsed = np.asarray(elapsed, dtype=np.float64)
+        store._real = np.asarray(real, dtype=np.float64)
+        store._target = np.asarray(target, dtype=np.float64)
+        if humidity is None:
+            humidity = np.full(len(store._elapsed), np.nan)
+        store._humidity = np.asarray(humidity, dtype=np.float64)
+        store._size = len(store._elapsed)
+        return store
+
+    @classmethod
+    def from_records(cls, records: np.ndarray):
+        # Columns stay strided views into the records, e.g. a memmap
+        return cls.from_columns(records["elapsed"], records["real_temp"],
+                                records["target_temp"], records["humidity"])
+
+    def to_records(self) -> np.ndarray:
+        records = np.empty(self._size, dtype=RECORD_DTYPE)
+        records["elapsed"] = self.elapsed
+        records["real_temp"] = self.real_temps
+        records["target_temp"] = self.target_temps
+        records["humidity"] = self.humidities
+        return records
+
+    @property
+    def elapsed(self) -> np.ndarray:
+        return self._elapsed[:self._size]
+
+    @property
+    def real_temps(self) -> np.ndarray:
+        return self._real[:self._size]
+
+    @property
+    def target_temps(self) -> np.ndarray:
+        return self._target[:self._size]
+
+    @property
+    def humidities(self) -> np.ndarray:
+        return self._humidity[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MeasurementStore.from_columns(
+                self.elapsed[index], self.real_temps[index],
+                self.target_temps[index], self.humidities[index])
+
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("MeasurementStore index out of range")
+        target_temp = float(self._target[index])
+        humidity = float(self._humidity[index])
+        return DataPoint(duration=dt.timedelta(seconds=float(self._elapsed[index])),
+                         real_temp=float(self._real[index]),
+                         target_temp=None if np.isnan(target_temp) else target_temp,
+                         humidity=None if np.isnan(humidity) else humidity)
+
+    def __iter__(self) -> Iterator[DataPoint]:
+        for index in range(self._size):
+            yield self[index]
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._elapsed)
+        if size <= capacity:
+            return
+        capacity = max(size, 2*capacity, 16)
+        for name in ("_elapsed", "_real", "_target", "_humidity"):
+            column = np.empty(capacity, dtype=np.float64)
+            column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+    def append(self, elapsed: float, real_temp: float, target_temp: float | None,
+               humidity: float | None = None) -> None:
+        self._reserve(self._size + 1)
+        self._elapsed[self._size] = elapsed
+        self._real[self._size] = real_temp
+        self._target[self._size] = np.nan if target_temp is None else target_temp
+        self._humidity[self._size] = np.nan if humidity is None else humidity
+        self._size += 1
+
+    def extend(self, elapsed: np.ndarray, real: np.ndarray, target: np.ndarray,
+               humidity: np.ndarray = None) -> None:
+        end = self._size + len(elapsed)
+        self._reserve(end)
+        self._elapsed[self._size:end] = elapsed
+        self._real[self._size:end] = real
+        self._target[self._size:end] = target
+        self._humidity[self._size:end] = np.nan if humidity is None else humidity
+        self._size = end
+
+    def copy(self):
+        return MeasurementStore.from_columns(
+            self.elapsed.copy(), self.real_temps.copy(),
+            self.target_temps.copy(), self.humidities.copy())
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def days(self) -> Iterator[tuple[int, "MeasurementStore"]]:
+        # Day n holds the samples with ((n-1) days, n days] elapsed
+        if self._size == 0:
+            return
+        days = np.maximum(np.ceil(self.elapsed / SECONDS_PER_DAY), 1).astype(np.int64)
+        bounds = np.flatnonzero(np.diff(days)) + 1
+        start = 0
+        for end in [*bounds.tolist(), self._size]:
+            yield int(days[start]), self[start:end]
+            start = end
+
+    def write_csv(self, file: TextIO) -> None:
+        durations = format_durations(self.elapsed)
+        file.writelines(f"{duration},{real},{target},{humidity}\n"
+                        for duration, real, target, humidity in
+                        zip(durations, self.real_temps.tolist(),
+                            self.target_temps.tolist(), self.humidities.tolist()))
+
+    @classmethod
+    def read_csv(cls, file: TextIO):
+        # Expects the header to be already consumed
+        store = cls()
+        for line in file:
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            # Archives from before humidity was recorded have three columns
+            duration, real_temp, target_temp, *humidity = line.split(",")
+            target_temp = float(target_temp) if target_temp != "None" else None
+            humidity = float(humidity[0]) if len(humidity) > 0 else None
+            store.append(parse_duration(duration), float(real_temp), target_temp, humidity)
+        return store
@@ -0,0 +1,19 @@
+"""Regression tests, run from the repository root with: python -m pytest tests
+
+Every test runs inside a temporary working directory, so sessions, outboxes
+and archives never touch resources/."""
+import pathlib
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
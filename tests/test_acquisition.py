@@ -0,0 +1,42 @@
+import asyncio
+import datetime as dt
+
+from src.acquisition import Acquisition, Channel
+from src.controller import Controller
+from src.runner import Runner
+
+
+class _BrokenSensor():
+    conversion_time = 0.0
+
+    def __init__(self):
+        self.triggers = 0
+
+    def trigger(self):
+        self.triggers += 1
+        raise ImportError("No module named 'smbus'")
+
+    def close(self):
+        pass
+
+
+def test_broken_sensor_pauses_the_measurement(workdir):
+    sensor = _BrokenSensor()
+    channel = Channel(sensor)
+    acquisition = Acquisition(1.0, [channel])
+    asyncio.run(acquisition.sample())
+    # Not read again until the runner has reported it
+    asyncio.run(acquisition.sample())
+    assert sensor.triggers == 1
+    assert isinstance(channel.error, ImportError)
+
+    controller = Controller(start_t=dt.datetime.now())
+    runner = Runner(controller, sensor, 1.0, channel=channel)
+    subscription = runner.subscribe()
+    runner.step()
+    runner.step()
+    events = [event["type"] for event in subscription.drain()]
+    runner.close(discard=True)
+
+    assert events.count("error") == 1 and "paused" in events
+    assert controller.paused and channel.error is None
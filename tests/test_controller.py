@@ -0,0 +1,51 @@
+import datetime as dt
+import pathlib
+
+from src.controller import Controller
+
+
+def test_failed_export_keeps_working_copy(workdir):
+    controller = Controller(start_t=dt.datetime.now(), measurement_path=workdir.joinpath("measurement.zip"))
+    controller.add_data_point(21.0, humidity=50.0)
+    controller.save_session()
+    controller.saver.wait()
+    root = controller.session.root
+
+    errors = []
+    controller.save_as_session(pathlib.Path("/nonexistent/out.zip"), on_done=errors.append)
+    controller.saver.wait()
+    for callback, err in controller.saver.completed():
+        callback(err)
+    # Save keeps going to the old path
+    assert controller.measurement_path == workdir.joinpath("measurement.zip")
+    assert controller.name == "Untitled"
+    controller.close_session(discard=True)
+    controller.saver.stop()
+
+    assert isinstance(errors[0], OSError)
+    assert isinstance(controller.export_error, OSError)
+    assert root.exists()
+    # Left unfinished, so the next start picks it up again
+    recovered = Controller.recover()
+    assert recovered is not None and recovered.session.root == root
+    assert recovered.data.real_temps.tolist() == [21.0]
+    recovered.close_session(discard=True)
+    recovered.saver.stop()
+
+
+def test_successful_export_discards_working_copy(workdir):
+    controller = Controller(start_t=dt.datetime.now(), measurement_path=workdir.joinpath("measurement.zip"))
+    controller.add_data_point(21.0, humidity=50.0)
+    controller.save_as_session(workdir.joinpath("renamed.zip"))
+    controller.saver.wait()
+    for callback, err in controller.saver.completed():
+        callback(err)
+    assert controller.measurement_path == workdir.joinpath("renamed.zip")
+    assert controller.name == "renamed" and not controller.temp_save
+    root = controller.session.root
+    controller.close_session(discard=not controller.temp_save)
+    controller.saver.stop()
+
+    assert controller.export_error is None
+    assert workdir.joinpath("renamed.zip").exists()
+    assert not root.exists()
@@ -0,0 +1,17 @@
+import stat
+
+from src.ipc import RemoteRunner, SampleServer
+
+
+def test_socket_is_private(workdir):
+    address = workdir.joinpath("chamber.sock")
+    # A stale socket of a killed daemon is replaced
+    address.touch()
+    server = SampleServer({"chamber": None}, address)
+    server.start()
+    try:
+        assert stat.S_IMODE(address.stat().st_mode) == 0o600
+        assert RemoteRunner(address).chambers() == ["chamber"]
+    finally:
+        server.stop()
+    assert not address.exists()
@@ -0,0 +1,90 @@
+import email
+import json
+import socket
+import threading
+import time
+
+from src import mail
+from src.mail import Mailer
+
+
+class _SMTPStub():
+    "Just enough of an SMTP server to take mails, turning away the first connections"
+
+    def __init__(self, refuse: int = 0):
+        self.refuse = refuse
+        self.connections: list[float] = []
+        self.messages: list[bytes] = []
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            with connection, connection.makefile("rb") as file:
+                self.connections.append(time.monotonic())
+                if len(self.connections) <= self.refuse:
+                    connection.sendall(b"554 Busy\r\n")
+                    continue
+                self._session(connection, file)
+
+    def _session(self, connection, file):
+        connection.sendall(b"220 stub\r\n")
+        for line in file:
+            command = line[:4].upper()
+            if command == b"DATA":
+                connection.sendall(b"354 Go ahead\r\n")
+                data = b""
+                for line in file:
+                    if line == b".\r\n":
+                        break
+                    data += line
+                self.messages.append(data)
+                connection.sendall(b"250 Queued\r\n")
+            elif command == b"QUIT":
+                connection.sendall(b"221 Bye\r\n")
+                return
+            else:
+                connection.sendall(b"250 OK\r\n")
+
+    def close(self):
+        self._socket.close()
+
+
+def test_split_archive_is_retried_and_reassembles(workdir, monkeypatch):
+    monkeypatch.setattr(mail, "MAX_ATTACHMENT", 1000)
+    monkeypatch.setattr(mail, "RETRY_DELAY_S", 0.2)
+    monkeypatch.setattr(mail, "summarize", lambda archive: "Samples: 3")
+    server = _SMTPStub(refuse=1)
+    config = workdir.joinpath("confidential.json")
+    config.write_text(json.dumps({"MAIL_SERVER": "127.0.0.1", "PORT": server.port,
+                                  "SECURITY": "none", "EMAIL": "chamber@example.com"}))
+    archive = workdir.joinpath("measurement.zip")
+    archive.write_bytes(bytes(range(256)) * 10)
+
+    mailer = Mailer(workdir.joinpath("outbox"), config)
+    mailer.submit(["lab@example.com"], "Measurement", "Attached.", archive, "measurement.zip")
+    # Every part fails once on the refused connection, then goes out
+    results = [mailer.results.get(timeout=10) for _ in range(6)]
+    mailer.stop()
+    server.close()
+
+    failed = [(sent, err, retrying) for sent, err, retrying in results if err is not None]
+    assert len(failed) == 3 and all(retrying for _, _, retrying in failed)
+    # Retried after the first delay, not at once
+    assert server.connections[1] - server.connections[0] >= 0.2
+    assert not any(mailer.root.iterdir())
+
+    messages = [email.message_from_bytes(data) for data in server.messages]
+    assert [message["Subject"] for message in messages] == \
+        [f"Measurement ({part}/3)" for part in range(1, 4)]
+    body, attachment = messages[0].get_payload()
+    assert body.get_payload(decode=True) == b"Attached.\n\nSamples: 3"
+    assert attachment.get_filename() == "measurement.zip.001"
+    # The parts join back into the archive
+    joined = b"".join(message.get_payload()[1].get_payload(decode=True) for message in messages)
+    assert joined == archive.read_bytes()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from src import profiles
+from src.profiles import Profile, ProfileCache
+
+
+def test_at_matches_call_on_steps():
+    # Ramps to 30, steps to 40 at one hour, holds, steps down to 20
+    profile = Profile(np.array([0.0, 3600.0, 3600.0, 7200.0, 7200.0, 10800.0]),
+                      np.array([20.0, 30.0, 40.0, 40.0, 20.0, 20.0]))
+    elapsed = np.array([-10.0, 0.0, 1800.0, 3599.0, 3600.0, 3601.0,
+                        7200.0, 9000.0, 10800.0, 20000.0])
+    assert profile.at(3600.0) == 40.0
+    assert [profile.at(t) for t in elapsed] == profile(elapsed).tolist()
+
+
+def test_sidecar_stays_out_of_the_template_directory(workdir, monkeypatch):
+    templates = workdir.joinpath("templates")
+    templates.mkdir()
+    path = templates.joinpath("profile.csv")
+    path.write_text("duration,temperature\n00:00:00,20\n01:00:00,30\n")
+    cache = workdir.joinpath("cache")
+    profile = ProfileCache(directory=cache).load(path)
+
+    assert list(templates.iterdir()) == [path]
+    assert len(list(cache.iterdir())) == 1
+    # A fresh cache, as after a restart, reads the sidecar instead of the template
+    monkeypatch.setattr(profiles, "iter_profile", None)
+    cached = ProfileCache(directory=cache).load(path)
+    assert cached(np.array([1800.0])).tolist() == profile(np.array([1800.0])).tolist() == [25.0]
@@ -0,0 +1,66 @@
+import datetime as dt
+import pathlib
+import subprocess
+import sys
+import textwrap
+
+from src.controller import Controller
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# A day of samples, a few into day 2, then the process dies while the
+# checkpoint of day 2 has appended its rows but not committed them
+CRASH = textwrap.dedent("""
+    import datetime as dt
+    import os
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import src.controller
+    from src.clock import SimulatedClock
+    from src.controller import Controller
+
+    write_figure = src.controller.write_figure
+
+    def crash(session, day, *args):
+        if day == 2:
+            os._exit(9)
+        write_figure(session, day, *args)
+    src.controller.write_figure = crash
+
+    clock = SimulatedClock(dt.datetime(2026, 1, 1))
+    controller = Controller(start_t=clock.now(), clock=clock)
+    controller.save_session()
+    controller.saver.wait()
+    for index in range(1, 24*6 + 6):
+        clock.advance(600)
+        controller.add_data_point(20.0 + index / 1000, humidity=50.0)
+    controller.sync_journal()
+    controller.save_session()
+    controller.saver.wait()
+""")
+
+
+def test_recover_after_crash_in_new_day_checkpoint(workdir):
+    result = subprocess.run([sys.executable, "-c", CRASH], cwd=workdir,
+                            env={"PYTHONPATH": str(ROOT)}, capture_output=True)
+    assert result.returncode == 9, result.stderr.decode()
+
+    controller = Controller.recover()
+    assert controller is not None
+    expected = [20.0 + index / 1000 for index in range(24*6 + 1, 24*6 + 6)]
+    assert controller.day == 2
+    assert controller.data.real_temps.tolist() == expected
+
+    # The measurement carries on, its samples land behind the recovered ones
+    for temp in (30.0, 31.0, 32.0):
+        time = controller.last_event_t + dt.timedelta(minutes=10)
+        controller.add_data_point(temp, time, 50.0)
+    controller.save_session()
+    controller.saver.wait()
+    session = controller.session
+    assert session.read(2).real_temps.tolist() == expected + [30.0, 31.0, 32.0]
+    assert len(session.read(1)) == 24*6
+    controller.close_session(discard=True)
+    controller.saver.stop()
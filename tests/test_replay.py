@@ -0,0 +1,40 @@
+import datetime as dt
+import pathlib
+
+from src.controller import Controller
+from src.replay import ReplayRunner, replay
+from src.session import SESSIONS_PATH
+
+
+def test_replay_session_is_never_recovered(workdir):
+    controller = Controller(start_t=dt.datetime.now(), measurement_path=workdir.joinpath("measurement.zip"))
+    for temp in (20.0, 21.0, 22.0):
+        controller.add_data_point(temp, humidity=50.0)
+    controller.save_as_session()
+    controller.close_session(discard=True)
+    controller.saver.stop()
+
+    replayed = Controller(name="measurement")
+    runner = ReplayRunner(replayed, workdir.joinpath("measurement.zip"), speed=float("inf"))
+    runner.start(pathlib.Path(runner.directory.name, "measurement.zip"))
+    replayed.save_session()
+    replayed.saver.wait()
+    # As if the replay crashed before closing
+    assert replayed.session.root.is_relative_to(runner.directory.name)
+    assert list(SESSIONS_PATH.iterdir()) == []
+    assert Controller.recover("replay") is None
+    runner.close()
+
+
+def test_replay_runs_through(workdir):
+    controller = Controller(start_t=dt.datetime.now(), measurement_path=workdir.joinpath("measurement.zip"))
+    for temp in (20.0, 21.0, 22.0):
+        controller.add_data_point(temp, humidity=50.0)
+    controller.save_as_session()
+    controller.close_session(discard=True)
+    controller.saver.stop()
+
+    events = []
+    replayed = replay(workdir.joinpath("measurement.zip"), events.append, interval=0.0)
+    assert replayed.data.real_temps.tolist() == [20.0, 21.0, 22.0]
+    assert "error" not in [event["type"] for event in events]
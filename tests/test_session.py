@@ -0,0 +1,43 @@
+import datetime as dt
+
+import numpy as np
+
+from src.session import Session
+from src.store import MeasurementStore
+
+START_T = dt.datetime(2026, 1, 1)
+
+
+def _rows(*temps: float, start: float = 0.0) -> MeasurementStore:
+    count = len(temps)
+    return MeasurementStore.from_columns(
+        start + 10*np.arange(1, count + 1, dtype=np.float64), np.array(temps, dtype=np.float64),
+        np.full(count, np.nan), np.full(count, 50.0))
+
+
+def test_uncommitted_day_is_dropped_on_open(workdir):
+    session = Session.create(START_T, sessions=workdir)
+    session.append(1, _rows(20.0))
+    session.commit()
+    # A new day appended but never committed, then the power goes
+    session.append(2, _rows(99.0, 99.0, 99.0))
+
+    session = Session.open(session.root)
+    session.append(2, _rows(21.0, 22.0, 23.0, 24.0, 25.0))
+    session.commit()
+
+    session = Session.open(session.root)
+    assert session.read(2).real_temps.tolist() == [21.0, 22.0, 23.0, 24.0, 25.0]
+    assert session.read(1).real_temps.tolist() == [20.0]
+
+
+def test_torn_append_is_dropped_on_open(workdir):
+    session = Session.create(START_T, sessions=workdir)
+    session.append(1, _rows(20.0, 21.0))
+    session.commit()
+    session.append(1, _rows(99.0))
+
+    session = Session.open(session.root)
+    session.append(1, _rows(22.0))
+    session.commit()
+    assert Session.open(session.root).read(1).real_temps.tolist() == [20.0, 21.0, 22.0]